@@ -0,0 +1,110 @@
+"""Static files with content hash in name, compressed in advance, so browsers can keep them forever.
+
+"flask build-assets" copies everything from "static" to "static/dist" as "<name>.<hash>.<extension>",
+together with gzip and brotli versions and "manifest.json" with new names. Templates use "asset_url",
+which gives URL of built file, or of original static file when assets are not built (e.g. during development)."""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+import click
+from flask import request, send_from_directory, url_for, abort
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUILD_FOLDER = "dist"
+MANIFEST = "manifest.json"
+# built file name changes with its content, so it never has to be checked again
+MAX_AGE = 365 * 24 * 3600
+# smaller files aren't worth compressing
+MIN_COMPRESS_SIZE = 512
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+def build_assets(static_folder):
+    """Builds all static files and returns manifest: {original name: built name}."""
+    build_folder = os.path.join(static_folder, BUILD_FOLDER)
+    manifest = {}
+    for folder, subfolders, files in os.walk(static_folder):
+        if os.path.abspath(folder) == os.path.abspath(static_folder):
+            subfolders[:] = [subfolder for subfolder in subfolders if subfolder != BUILD_FOLDER]
+        for file_name in files:
+            path = os.path.join(folder, file_name)
+            name = os.path.relpath(path, static_folder).replace(os.sep, "/")
+            with open(path, "rb") as file:
+                content = file.read()
+            stem, extension = os.path.splitext(name)
+            built_name = f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}"
+            built_path = os.path.join(build_folder, built_name)
+            os.makedirs(os.path.dirname(built_path), exist_ok=True)
+            _write(built_path, content)
+            mimetype = mimetypes.guess_type(name)[0] or ""
+            if len(content) >= MIN_COMPRESS_SIZE and mimetype.startswith(COMPRESSIBLE_TYPES):
+                _write(built_path + ".gz", gzip.compress(content, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    _write(built_path + ".br", brotli.compress(content))
+            manifest[name] = built_name
+    _write(os.path.join(build_folder, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode())
+    return manifest
+
+
+def _write(path, content):
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(content)
+    os.replace(temporary_path, path)
+
+
+class Assets:
+    """Serves built files on "/assets/<name>" (compressed, if browser accepts it) and adds "asset_url" to templates."""
+
+    def __init__(self, app):
+        self.build_folder = os.path.join(app.static_folder, BUILD_FOLDER)
+        self.manifest = self.load_manifest()
+        app.add_url_rule("/assets/<path:filename>", "assets", self.send_asset)
+        app.add_template_global(self.asset_url, "asset_url")
+
+        @app.cli.command("build-assets")
+        def build_assets_command():
+            """Builds static files, run it before starting app."""
+            self.manifest = build_assets(app.static_folder)
+            click.echo(f"Built {len(self.manifest)} files in {self.build_folder}")
+
+    def load_manifest(self):
+        try:
+            with open(os.path.join(self.build_folder, MANIFEST)) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def asset_url(self, filename):
+        """Used in templates like "url_for('static', filename=...)"."""
+        built_name = self.manifest.get(filename)
+        if built_name is None:
+            return url_for("static", filename=filename)
+        return url_for("assets", filename=built_name)
+
+    def send_asset(self, filename):
+        if filename.endswith((".gz", ".br", ".tmp")) or filename == MANIFEST:
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        accepted = request.accept_encodings
+        encoding = None
+        for candidate, suffix in [("br", ".br"), ("gzip", ".gz")]:
+            if accepted[candidate] and os.path.isfile(os.path.join(self.build_folder, filename + suffix)):
+                encoding = candidate
+                filename += suffix
+                break
+        response = send_from_directory(self.build_folder, filename, mimetype=mimetype, max_age=MAX_AGE,
+                                       conditional=True)
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
@@ -0,0 +1,102 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+
+def avatar_hash(email):
+    """Gravatar hash of email, stored with user so pages don't hash emails while rendering."""
+    return hashlib.md5(email.strip().lower().encode()).hexdigest()
+
+
+def image_type(image):
+    if image.startswith(b"\x89PNG"):
+        return "image/png"
+    if image.startswith(b"GIF8"):
+        return "image/gif"
+    return "image/jpeg"
+
+
+class AvatarCache:
+    """Avatars downloaded from Gravatar (or other service with the same API at "upstream") and kept on disk.
+    Files are shared by all app processes. When they take more than "max_bytes", least recently used are deleted.
+    Failed download is remembered for "failure_ttl" seconds, so when upstream is slow or down requests don't wait
+    for it again.
+
+    To try it without internet, serve any image as "<upstream><hash>", e.g. with "python -m http.server"."""
+
+    def __init__(self, directory, max_bytes, upstream="https://www.gravatar.com/avatar/", size=50, default="robohash",
+                 rating="r", timeout=5, failure_ttl=60):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.upstream = upstream
+        self.query = urllib.parse.urlencode({"s": size, "d": default, "r": rating})
+        self.timeout = timeout
+        self.failure_ttl = failure_ttl
+        self._lock = threading.Lock()
+
+    def upstream_url(self, avatar_hash):
+        return f"{self.upstream}{avatar_hash}?{self.query}"
+
+    def get(self, avatar_hash):
+        """Returns path to avatar file, downloading it if it's not cached, or None if it can't be downloaded."""
+        path = os.path.join(self.directory, avatar_hash)
+        try:
+            # modification time is time of last use, for eviction
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+        # marker of failed download, its name starts with "." so it's never evicted or served as avatar
+        failure_path = os.path.join(self.directory, f".failed-{avatar_hash}")
+        try:
+            if time.time() - os.stat(failure_path).st_mtime < self.failure_ttl:
+                return None
+        except FileNotFoundError:
+            pass
+        try:
+            with urllib.request.urlopen(self.upstream_url(avatar_hash), timeout=self.timeout) as response:
+                image = response.read()
+        except (urllib.error.URLError, OSError) as error:
+            logger.warning("Avatar %s not downloaded: %s", avatar_hash, error)
+            os.makedirs(self.directory, exist_ok=True)
+            # opening it sets its modification time to now
+            with open(failure_path, "wb"):
+                pass
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        # written to temporary file first, so other processes never read half of the file
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, prefix=".")
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(image)
+        os.replace(temporary_path, path)
+        try:
+            os.remove(failure_path)
+        except FileNotFoundError:
+            pass
+        self._evict()
+        return path
+
+    def _evict(self):
+        with self._lock:
+            files = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.startswith("."):
+                    file_stat = entry.stat()
+                    files.append((file_stat.st_mtime, file_stat.st_size, entry.path))
+            total_size = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total_size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_size -= size
@@ -0,0 +1,12 @@
+"""Benchmarks of the app on generated data, run as modules from project root: "python -m benchmarks.<name>"."""
+import os
+import tempfile
+
+# benchmarks drop and fill database, so they never use the one from ".env"
+os.environ["DATABASE_URL"] = os.environ.get(
+    "BENCHMARK_DATABASE_URL",
+    "sqlite:///" + os.path.join(tempfile.gettempdir(), "project_manager_benchmark.db")
+)
+os.environ.setdefault("SECRET_KEY", "benchmark")
+# avatars are never downloaded from internet during benchmarks
+os.environ.setdefault("AVATAR_CACHE_DIR", os.path.join(tempfile.gettempdir(), "project_manager_benchmark_avatars"))
@@ -0,0 +1,71 @@
+"""Compares query plans and times of the main filters with and without indexes added to the schema.
+
+    python -m benchmarks.indexes [--projects 200] [--repeat 200]
+"""
+import argparse
+import time
+from datetime import date
+from benchmarks.seed import reset_database, seed
+from extensions import db
+from main import create_app
+from models import Task, User, user_task
+
+# indexes added by migration 9889351f1664, "user_task" primary key is left, it can't be dropped in SQLite
+INDEXES = ["ix_tasks_project_id_deadline", "ix_users_project_id", "ix_users_position", "ix_user_task_task_id"]
+
+
+def filters(project_id, task_id):
+    """Filters used by the app views, by name of the view."""
+    return {
+        "users_selection (users on project)": User.query.filter_by(project_id=project_id),
+        "users_selection (managers)": User.query.filter_by(position="manager"),
+        "choose_task_to_edit": Task.query.filter_by(project_id=project_id),
+        "index (project tasks by deadline)": Task.query.filter(Task.project_id == project_id,
+                                                               Task.deadline < date.today()),
+        "edit_task (users on task)": db.session.query(user_task).filter(user_task.c.task_id == task_id),
+    }
+
+
+def execute(query, prefix=""):
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    parameters = compiled.params
+    if compiled.positional:
+        parameters = tuple(parameters[name] for name in compiled.positiontup)
+    return db.session.connection().exec_driver_sql(prefix + str(compiled), parameters).fetchall()
+
+
+def query_plan(query):
+    if db.engine.dialect.name == "sqlite":
+        return "; ".join(row[-1] for row in execute(query, "EXPLAIN QUERY PLAN "))
+    return "; ".join(row[0].strip() for row in execute(query, "EXPLAIN "))
+
+
+def report(title, repeat, project_id, task_id):
+    print(f"\n--- {title}")
+    for name, query in filters(project_id, task_id).items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            execute(query)
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+        print(f"{name:<40} {elapsed:8.3f} ms   {query_plan(query)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    arguments = parser.parse_args()
+    with create_app().app_context():
+        reset_database()
+        print(seed(projects=arguments.projects))
+        project_id = arguments.projects // 2
+        task_id = db.session.query(Task.id).filter_by(project_id=project_id).first()[0]
+        report("with indexes", arguments.repeat, project_id, task_id)
+        for index in INDEXES:
+            db.session.execute(db.text(f"DROP INDEX {index}"))
+        db.session.commit()
+        report("without indexes", arguments.repeat, project_id, task_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Compares throughput of gunicorn configurations ("gunicorn.conf.py") on the app routes.
+
+    python -m benchmarks.load_test [--clients 16] [--seconds 10] [--workers 2]
+
+Every configuration is started as separate gunicorn server on seeded benchmark database (SQLite file
+unless BENCHMARK_DATABASE_URL is set), then clients logged in as manager request the routes in a loop.
+"""
+import argparse
+import http.cookiejar
+import importlib.util
+import os
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from benchmarks.seed import reset_database, seed, MANAGER_EMAIL, PASSWORD
+from main import create_app
+
+ROUTES = ["/", "/users", "/edit-task/1", "/delete-tasks/1", "/401"]
+PORT = 8765
+
+
+def configurations(workers):
+    """Environment of gunicorn for every configuration, by its name."""
+    result = {
+        f"sync, {workers} workers": {"GUNICORN_WORKER_CLASS": "sync"},
+        f"gthread, {workers} workers x 4 threads": {"GUNICORN_WORKER_CLASS": "gthread", "GUNICORN_THREADS": "4"},
+    }
+    if importlib.util.find_spec("gevent") and importlib.util.find_spec("psycogreen"):
+        result[f"gevent, {workers} workers"] = {"GUNICORN_WORKER_CLASS": "gevent"}
+    for environment in result.values():
+        environment["WEB_CONCURRENCY"] = str(workers)
+    return result
+
+
+def start_server(environment):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{PORT}", "main:create_app()"],
+        env={**os.environ, **environment}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{PORT}/401")
+            return server
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("gunicorn didn't start")
+
+
+def logged_in_opener():
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    login_page = opener.open(f"http://127.0.0.1:{PORT}/login").read().decode()
+    csrf_token = re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', login_page).group(1)
+    data = urllib.parse.urlencode({"email": MANAGER_EMAIL, "password": PASSWORD, "csrf_token": csrf_token})
+    opener.open(f"http://127.0.0.1:{PORT}/login", data=data.encode())
+    return opener
+
+
+def load(clients, seconds):
+    stop = threading.Event()
+    times, errors = [], []
+
+    def client(opener, offset):
+        number = offset
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                opener.open(f"http://127.0.0.1:{PORT}{ROUTES[number % len(ROUTES)]}").read()
+                times.append((time.perf_counter() - start) * 1000)
+            except (urllib.error.URLError, ConnectionError):
+                errors.append(1)
+            number += 1
+
+    threads = [threading.Thread(target=client, args=(logged_in_opener(), number)) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    times.sort()
+    return {
+        "requests/s": len(times) / seconds,
+        "errors/s": len(errors) / seconds,
+        "p50 ms": statistics.median(times) if times else float("nan"),
+        "p99 ms": times[int(len(times) * 0.99)] if times else float("nan"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=2)
+    arguments = parser.parse_args()
+    with create_app().app_context():
+        reset_database()
+        print(seed(projects=20))
+    for name, environment in configurations(arguments.workers).items():
+        server = start_server(environment)
+        try:
+            result = load(arguments.clients, arguments.seconds)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{name:<36} " + "   ".join(f"{key} {value:8.1f}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
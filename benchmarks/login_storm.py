@@ -0,0 +1,87 @@
+"""Measures login throughput and latency of other pages while many users log in at once,
+with passwords hashed in request threads and in pool of processes.
+
+    python -m benchmarks.login_storm [--logins 16] [--browsing 4] [--seconds 10]
+
+Requests are sent from threads through Flask test client, like to one multi-threaded app worker.
+"""
+import argparse
+import statistics
+import threading
+import time
+from benchmarks.seed import reset_database, seed, MANAGER_EMAIL, PASSWORD
+from hashing import PasswordHasher
+from main import create_app
+
+SCENARIOS = {
+    "hashing in request thread": {"workers": 0, "queue_size": 0},
+    "pool of 2 processes, queue 4": {"workers": 2, "queue_size": 4},
+}
+
+
+def percentile(values, percent):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def run_scenario(app, login_threads, browsing_threads, seconds, **hasher_options):
+    hasher = app.extensions["password_hasher"] = PasswordHasher(method=app.config["PASSWORD_HASH_METHOD"],
+                                                                salt_length=app.config["PASSWORD_SALT_LENGTH"],
+                                                                **hasher_options)
+    # start pool before measuring
+    hasher.hash(PASSWORD)
+    stop = threading.Event()
+    logins, rejected, page_times = [], [], []
+
+    def log_in():
+        client = app.test_client()
+        while not stop.is_set():
+            response = client.post("/login", data={"email": MANAGER_EMAIL, "password": PASSWORD})
+            (logins if response.status_code == 302 else rejected).append(1)
+
+    def browse():
+        client = app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get("/401")
+            page_times.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=log_in) for _ in range(login_threads)]
+    threads += [threading.Thread(target=browse) for _ in range(browsing_threads)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    hasher.shutdown()
+    return {
+        "logins/s": len(logins) / seconds,
+        "rejected/s": len(rejected) / seconds,
+        "pages/s": len(page_times) / seconds,
+        "page p50 ms": statistics.median(page_times) if page_times else float("nan"),
+        "page p99 ms": percentile(page_times, 99),
+    }
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=16, help="number of threads logging in")
+    parser.add_argument("--browsing", type=int, default=4, help="number of threads requesting other page")
+    parser.add_argument("--seconds", type=float, default=10)
+    arguments = parser.parse_args()
+    app = create_app({"WTF_CSRF_ENABLED": False})
+    with app.app_context():
+        reset_database()
+        seed(projects=1, tasks_per_project=1, users_per_project=1, free_users=0)
+        # seeded hash has other parameters, log in once so it isn't hashed again on every login
+        app.test_client().post("/login", data={"email": MANAGER_EMAIL, "password": PASSWORD})
+    for name, options in SCENARIOS.items():
+        result = run_scenario(app, arguments.logins, arguments.browsing, arguments.seconds, **options)
+        print(f"{name:<32} " + "   ".join(f"{key} {value:8.1f}" for key, value in result.items()))
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,247 @@
+"""Requests every route as manager and as user, measuring time, number of SQL queries and rows touched.
+Fails if any route goes over its budget from "routes_budget.json".
+
+    python -m benchmarks.routes [--projects 50] [--repeat 20] [--ignore-time] [--save-budget]
+
+Rows touched are rows changed by the route, and also rows read on PostgreSQL (SQLite doesn't report them).
+After intended change of route cost, save new budget with "--save-budget" and commit it. Time depends on machine,
+so budget is saved with margin and can be skipped with "--ignore-time".
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from sqlalchemy import event
+from benchmarks.seed import reset_database, seed, MANAGER_EMAIL, PASSWORD
+from extensions import db
+from main import create_app
+from models import Project, Task, User, user_task
+
+BUDGET_FILE = os.path.join(os.path.dirname(__file__), "routes_budget.json")
+# time budget is saved as measured time times TIME_MARGIN plus TIME_SLACK_MS
+TIME_MARGIN = 2
+TIME_SLACK_MS = 5
+
+
+class QueryCounter:
+    """Counts SQL statements and rows they touched, while "active"."""
+
+    def __init__(self, engine):
+        self.active = False
+        self.queries = 0
+        self.rows = 0
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def after_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        if self.active:
+            self.queries += 1
+            self.rows += max(cursor.rowcount, 0)
+
+    def reset(self):
+        self.queries = 0
+        self.rows = 0
+
+
+def benchmark_ids():
+    """IDs used in URLs: project in the middle, one of its tasks and user assigned to that task."""
+    project_id = db.session.query(Project.id).order_by(Project.id).offset(
+        db.session.query(Project.id).count() // 2).first()[0]
+    task_id, user_id = db.session.query(user_task.c.task_id, user_task.c.user_id) \
+        .join(Task, Task.id == user_task.c.task_id) \
+        .filter(Task.project_id == project_id) \
+        .order_by(user_task.c.task_id).first()
+    user = User.query.get(user_id)
+    return {"project": project_id, "project_name": Project.query.get(project_id).name, "task": task_id,
+            "user": user_id, "user_email": user.email, "avatar": user.avatar_hash}
+
+
+def new_task(project_id, number):
+    task = Task(title=f"Benchmark task {number}", description="To be deleted", project_id=project_id,
+                deadline=date.today() + timedelta(days=10), task_done=False)
+    db.session.add(task)
+    db.session.commit()
+    return {"list": [str(task.id)]}
+
+
+def new_project(number):
+    project = Project(name=f"Benchmark project {number}")
+    db.session.add(project)
+    db.session.commit()
+    return {"list": [str(project.id)]}
+
+
+def new_user(number):
+    user = User(name=f"Benchmark user {number}", email=f"delete{number}@email.com", password="-", position="tester")
+    db.session.add(user)
+    db.session.commit()
+    return {"list": [str(user.id)]}
+
+
+def scenarios(ids):
+    """Requests by name: (role, method, URL, form data). Data can be function of request number, for requests that
+    need new objects (e.g. something to delete) or unique values each time."""
+    project, task, user = ids["project"], ids["task"], ids["user"]
+    deadline = (date.today() + timedelta(days=5)).isoformat()
+    return {
+        "manager GET /": ("manager", "get", "/", None),
+        "manager GET / hide done": ("manager", "get", "/?hide_done=1", None),
+        "manager GET /?after": ("manager", "get", f"/?after={project}", None),
+        "manager POST / toggle": ("manager", "post", "/", {"id": str(task), "done": "DONE"}),
+        "manager POST /task/<id>/done": ("manager", "post", f"/task/{task}/done",
+                                         lambda number: {"undone": "UNDONE"} if number % 2 else {"done": "DONE"}),
+        "manager GET /project/board": ("manager", "get", f"/project/{project}/board", None),
+        "manager GET /project/tasks": ("manager", "get", f"/project/{project}/tasks?after={task}", None),
+        "manager GET /add-project": ("manager", "get", "/add-project", None),
+        "manager POST /add-project": ("manager", "post", "/add-project",
+                                      lambda number: {"name": f"Added project {number}"}),
+        "manager GET /edit-project": ("manager", "get", "/edit-project", None),
+        "manager GET /edit-project/<id>": ("manager", "get", f"/edit-project/{project}", None),
+        "manager POST /edit-project/<id>": ("manager", "post", f"/edit-project/{project}",
+                                            {"name": ids["project_name"]}),
+        "manager GET /delete-project": ("manager", "get", "/delete-project", None),
+        "manager POST /delete-project": ("manager", "post", "/delete-project", new_project),
+        "manager GET /add-task": ("manager", "get", "/add-task", None),
+        "manager GET /add-task/<id>": ("manager", "get", f"/add-task/{project}", None),
+        "manager POST /add-task/<id>": ("manager", "post", f"/add-task/{project}",
+                                        lambda number: {"title": f"Added task {number}", "description": "Added",
+                                                        "deadline": deadline, "free_users": [str(user)]}),
+        "manager GET /edit-task/": ("manager", "get", "/edit-task/", None),
+        "manager GET /edit-task/<id>": ("manager", "get", f"/edit-task/{project}", None),
+        "manager GET /edit-task/<id>/<id>": ("manager", "get", f"/edit-task/{project}/{task}", None),
+        "manager POST /edit-task/<id>/<id>": ("manager", "post", f"/edit-task/{project}/{task}",
+                                              {"title": f"Edited task {task}", "description": "Edited",
+                                               "deadline": deadline}),
+        "manager GET /delete-tasks": ("manager", "get", "/delete-tasks", None),
+        "manager GET /delete-tasks/<id>": ("manager", "get", f"/delete-tasks/{project}", None),
+        "manager POST /delete-tasks/<id>": ("manager", "post", f"/delete-tasks/{project}",
+                                            lambda number: new_task(project, number)),
+        "manager GET /users": ("manager", "get", "/users", None),
+        "manager GET /add-user": ("manager", "get", "/add-user", None),
+        "manager POST /add-user": ("manager", "post", "/add-user",
+                                   lambda number: {"name": f"Added user {number}", "email": f"added{number}@email.com",
+                                                   "password": PASSWORD, "position": "developer"}),
+        "manager GET /edit-user/<id>": ("manager", "get", f"/edit-user/{user}", None),
+        "manager POST /edit-user/<id>": ("manager", "post", f"/edit-user/{user}",
+                                         {"email": ids["user_email"], "position": "developer"}),
+        "manager GET /delete-users": ("manager", "get", "/delete-users", None),
+        "manager POST /delete-users": ("manager", "post", "/delete-users", new_user),
+        "manager GET /search": ("manager", "get", "/search?q=task", None),
+        "manager GET /import": ("manager", "get", "/import", None),
+        "manager GET /export.jsonl": ("manager", "get", "/export.jsonl", None),
+        "manager GET /statistics": ("manager", "get", "/statistics", None),
+        "manager GET /statistics/data": ("manager", "get", "/statistics/data", None),
+        "user GET /": ("user", "get", "/", None),
+        "user POST / toggle": ("user", "post", "/", {"id": str(task), "done": "DONE"}),
+        "user POST /task/<id>/done": ("user", "post", f"/task/{task}/done", {"done": "DONE"}),
+        "user GET /project/tasks": ("user", "get", f"/project/{project}/tasks?after={task}", None),
+        "user GET /search": ("user", "get", "/search?q=task", None),
+        "user GET /avatar/<hash>": ("user", "get", f"/avatar/{ids['avatar']}", None),
+        "user GET /change-password": ("user", "get", "/change-password", None),
+        "user GET /edit-user/<id>": ("user", "get", f"/edit-user/{user}", None),
+        "user GET /401": ("user", "get", "/401", None),
+        "anonymous GET /login": ("anonymous", "get", "/login", None),
+        "anonymous GET /password-recovery": ("anonymous", "get", "/password-recovery", None),
+    }
+
+
+def measure(clients, counter, request, repeat):
+    role, method, url, data = request
+    # sent forms redirect when they're accepted, only main page is shown again after task is set done
+    # and card of the task is returned by its "done" URL
+    accepted_statuses = (200, 302) if method == "get" or url == "/" else (200,) if url.endswith("/done") else (302,)
+    results = []
+    # first request only warms up caches
+    for number in range(repeat + 1):
+        form = data(number) if callable(data) else data
+        counter.reset()
+        counter.active = True
+        start = time.perf_counter()
+        response = getattr(clients[role], method)(url, data=form)
+        # main page is streamed, it's rendered while response is read
+        response.get_data()
+        response.close()
+        elapsed = (time.perf_counter() - start) * 1000
+        counter.active = False
+        if response.status_code not in accepted_statuses:
+            raise RuntimeError(f"{method.upper()} {url} as {role}: {response.status_code}")
+        if number:
+            results.append((elapsed, counter.queries, counter.rows))
+    return {"ms": statistics.median(elapsed for elapsed, _, _ in results),
+            "queries": max(queries for _, queries, _ in results),
+            "rows": max(rows for _, _, rows in results)}
+
+
+def logged_in_client(app, email):
+    client = app.test_client()
+    if email is not None:
+        response = client.post("/login", data={"email": email, "password": PASSWORD})
+        if response.status_code != 302:
+            raise RuntimeError(f"{email} can't log in")
+    return client
+
+
+def over_budget(result, budget, ignore_time):
+    """Names of measurements over budget."""
+    exceeded = [key for key in ("queries", "rows") if result[key] > budget[key]]
+    if not ignore_time and result["ms"] > budget["ms"]:
+        exceeded.append("ms")
+    return exceeded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--ignore-time", action="store_true", help="check only queries and rows")
+    parser.add_argument("--save-budget", action="store_true", help="save results as new budget")
+    arguments = parser.parse_args()
+    app = create_app({"WTF_CSRF_ENABLED": False})
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+        reset_database()
+        print(seed(projects=arguments.projects))
+        ids = benchmark_ids()
+        # avatar is served from disk cache, without downloading it
+        os.makedirs(app.config["AVATAR_CACHE_DIR"], exist_ok=True)
+        with open(os.path.join(app.config["AVATAR_CACHE_DIR"], ids["avatar"]), "wb") as file:
+            file.write(b"GIF89a")
+        clients = {"manager": logged_in_client(app, MANAGER_EMAIL), "user": logged_in_client(app, ids["user_email"]),
+                   "anonymous": logged_in_client(app, None)}
+        results = {name: measure(clients, counter, request, arguments.repeat)
+                   for name, request in scenarios(ids).items()}
+
+    budgets = {}
+    if os.path.exists(BUDGET_FILE):
+        with open(BUDGET_FILE) as file:
+            budgets = json.load(file)
+    failed = []
+    print(f"\n{'route':<40} {'ms':>8} {'queries':>8} {'rows':>8}   budget")
+    for name, result in results.items():
+        budget = budgets.get(name)
+        if budget is None:
+            status = "no budget"
+        else:
+            exceeded = over_budget(result, budget, arguments.ignore_time)
+            status = "OVER: " + ", ".join(exceeded) if exceeded else "ok"
+            if exceeded:
+                failed.append(name)
+        print(f"{name:<40} {result['ms']:8.2f} {result['queries']:8} {result['rows']:8}   {status}")
+
+    if arguments.save_budget:
+        budgets = {name: {"ms": round(result["ms"] * TIME_MARGIN + TIME_SLACK_MS, 1),
+                          "queries": result["queries"], "rows": result["rows"]}
+                   for name, result in results.items()}
+        with open(BUDGET_FILE, "w") as file:
+            json.dump(budgets, file, indent=2)
+            file.write("\n")
+        print(f"\nBudget saved to {BUDGET_FILE}")
+    elif failed:
+        print(f"\n{len(failed)} route(s) over budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
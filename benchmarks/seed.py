@@ -0,0 +1,94 @@
+"""Fills benchmark database with generated projects, tasks and users.
+
+    python -m benchmarks.seed [--projects 50] [--tasks-per-project 40] [--users-per-project 10] ...
+
+Database is BENCHMARK_DATABASE_URL (SQLite or PostgreSQL), or temporary SQLite file if it's not set.
+"""
+import argparse
+import random
+from datetime import date, timedelta
+from werkzeug.security import generate_password_hash
+from avatar import avatar_hash
+from extensions import db
+from helpers import rebuild_stats
+from main import create_app
+from models import Project, Task, User, user_task
+
+MANAGER_EMAIL = "manager@email.com"
+PASSWORD = "123"
+
+
+def reset_database():
+    db.drop_all()
+    db.create_all()
+
+
+def seed(projects=50, tasks_per_project=40, users_per_project=10, tasks_per_user=4, free_users=20, seed_value=0):
+    """Inserts generated data in bulk and returns number of added rows for each table.
+    Every user can log in with the same password, manager with MANAGER_EMAIL."""
+    generator = random.Random(seed_value)
+    # hashing is the slowest part of adding user, all of them can share one password
+    password = generate_password_hash(password=PASSWORD, method="pbkdf2:sha256", salt_length=8)
+    today = date.today()
+
+    db.session.execute(Project.__table__.insert(), [{"name": f"Project {number}"} for number in range(projects)])
+    project_ids = [project_id for project_id, in db.session.query(Project.id).order_by(Project.id)]
+
+    db.session.execute(Task.__table__.insert(), [
+        {
+            "title": f"Task {project_id}-{number}",
+            "description": f"Description of task {number} in project {project_id}",
+            "deadline": today + timedelta(days=generator.randint(-30, 30)),
+            "project_id": project_id,
+            "task_done": generator.random() < 0.3,
+        }
+        for project_id in project_ids for number in range(tasks_per_project)
+    ])
+    project_tasks = {project_id: [] for project_id in project_ids}
+    for task_id, project_id in db.session.query(Task.id, Task.project_id):
+        project_tasks[project_id].append(task_id)
+
+    users = [{"email": MANAGER_EMAIL, "name": "Manager", "password": password, "position": "manager",
+              "project_id": None}]
+    users += [{"email": f"user{project_id}-{number}@email.com", "name": f"User {project_id}-{number}",
+               "password": password, "position": "developer", "project_id": project_id}
+              for project_id in project_ids for number in range(users_per_project)]
+    users += [{"email": f"free{number}@email.com", "name": f"Free User {number}", "password": password,
+               "position": "developer", "project_id": None} for number in range(free_users)]
+    # bulk insert skips model, so avatar hash has to be set here
+    for user in users:
+        user["avatar_hash"] = avatar_hash(user["email"])
+    db.session.execute(User.__table__.insert(), users)
+
+    links = []
+    for user_id, project_id in db.session.query(User.id, User.project_id).filter(User.project_id.isnot(None)):
+        tasks = project_tasks[project_id]
+        links += [{"user_id": user_id, "task_id": task_id}
+                  for task_id in generator.sample(tasks, min(tasks_per_user, len(tasks)))]
+    if links:
+        db.session.execute(user_task.insert(), links)
+    rebuild_stats()
+    db.session.commit()
+    return {"projects": len(project_ids), "tasks": sum(len(tasks) for tasks in project_tasks.values()),
+            "users": len(users), "user_task": len(links)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--tasks-per-project", type=int, default=40)
+    parser.add_argument("--users-per-project", type=int, default=10)
+    parser.add_argument("--tasks-per-user", type=int, default=4)
+    parser.add_argument("--free-users", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0, help="seed of random generator, same seed gives same data")
+    arguments = parser.parse_args()
+    with create_app().app_context():
+        reset_database()
+        print(seed(projects=arguments.projects, tasks_per_project=arguments.tasks_per_project,
+                   users_per_project=arguments.users_per_project, tasks_per_user=arguments.tasks_per_user,
+                   free_users=arguments.free_users, seed_value=arguments.seed))
+        print(f"Database: {db.engine.url!r}, manager: {MANAGER_EMAIL}, password of every user: {PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
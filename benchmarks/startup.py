@@ -0,0 +1,46 @@
+"""Measures how long a new process (gunicorn worker without preloading, CLI command, test) takes to start the app:
+import of "main", "create_app" and first request.
+
+    python -m benchmarks.startup [--repeat 10]
+
+Every measurement is done in fresh Python process, so nothing is imported yet, and medians are reported.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+MEASURE = """
+import json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+app = main.create_app()
+created = time.perf_counter()
+app.test_client().get("/login")
+requested = time.perf_counter()
+print(json.dumps({"import ms": (imported - start) * 1000, "create_app ms": (created - imported) * 1000,
+                  "first request ms": (requested - created) * 1000, "total ms": (requested - start) * 1000}))
+"""
+
+
+def measure_once():
+    # imports aren't cached by "benchmarks" package, like in new worker
+    output = subprocess.run([sys.executable, "-c", MEASURE], env=os.environ, check=True,
+                            stdout=subprocess.PIPE, cwd=os.path.dirname(os.path.dirname(__file__)) or ".").stdout
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10)
+    arguments = parser.parse_args()
+    results = [measure_once() for _ in range(arguments.repeat)]
+    for key in results[0]:
+        print(f"{key:<20} {statistics.median(result[key] for result in results):8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe in-process cache, entries expire after "ttl" seconds ("ttl" 0 turns cache off).
+    When there are more than "max_size" entries, least recently used one is dropped.
+    Each app process has its own cache, so entries changed in other process are seen only after they expire."""
+
+    def __init__(self, ttl, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FragmentCache:
+    """Thread-safe in-process cache of rendered HTML fragments, limited by their total size ("max_bytes" 0 turns cache
+    off). Entries don't expire, key should contain everything fragment depends on (e.g. version of its data),
+    so outdated fragments are simply not asked for anymore and least recently used ones are dropped to make room."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, fragment):
+        fragment_size = len(fragment.encode())
+        if fragment_size > self.max_bytes:
+            return
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self.size -= old_entry[0]
+            self._entries[key] = (fragment_size, fragment)
+            self.size += fragment_size
+            while self.size > self.max_bytes:
+                dropped_size, _ = self._entries.popitem(last=False)[1]
+                self.size -= dropped_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
@@ -0,0 +1,85 @@
+"""Runtime settings read from environment variables."""
+import os
+
+
+def env_flag(name, default):
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+def database_uri(instance_path):
+    """DATABASE_URL (as set by Heroku) or SQLite file in instance folder, when it's not set."""
+    uri = os.environ.get("DATABASE_URL")
+    if not uri:
+        return "sqlite:///" + os.path.join(instance_path, "project_manager.db")
+    # SQLAlchemy knows PostgreSQL only as "postgresql", Heroku still gives "postgres" URLs
+    if uri.startswith("postgres://"):
+        uri = "postgresql://" + uri[len("postgres://"):]
+    return uri
+
+
+def app_config(instance_path):
+    """All app settings, read from environment (and ".env" file) when app is created."""
+    mail_username = os.environ.get("MAIL_USERNAME")
+    uri = database_uri(instance_path)
+    return {
+        "SQLALCHEMY_DATABASE_URI": uri,
+        "SECRET_KEY": os.environ.get("SECRET_KEY"),
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        # SQL and template time of each request in "Server-Timing" header, latency of routes on "/metrics"
+        "SERVER_TIMING": env_flag("SERVER_TIMING", True),
+        # statement executed this many times in one request is logged as probable N+1 query
+        "REPEATED_STATEMENT_THRESHOLD": int(os.environ.get("REPEATED_STATEMENT_THRESHOLD", 5)),
+        # for how many seconds logged in user data is reused between requests, without checking DB (0 turns it off)
+        "PRINCIPAL_CACHE_TTL": int(os.environ.get("PRINCIPAL_CACHE_TTL", 30)),
+        # for how many seconds lists of projects, users and tasks in selection forms are reused (0 turns it off)
+        "CHOICES_CACHE_TTL": int(os.environ.get("CHOICES_CACHE_TTL", 60)),
+        # how many bytes of rendered project tasks can be kept for main page (0 turns it off)
+        "FRAGMENT_CACHE_SIZE": int(os.environ.get("FRAGMENT_CACHE_SIZE", 32 * 1024 * 1024)),
+        # changes pushed to open main pages, each open page keeps one worker thread (or gevent greenlet) busy
+        "EVENTS_ENABLED": env_flag("EVENTS_ENABLED", False),
+        # "memory" (clients see changes made in the same process) or "postgres" (LISTEN/NOTIFY, all processes)
+        "EVENTS_BACKEND": os.environ.get("EVENTS_BACKEND", "postgres" if uri.startswith("postgresql") else "memory"),
+        "EVENTS_QUEUE_SIZE": int(os.environ.get("EVENTS_QUEUE_SIZE", 100)),
+        # stream is closed after this many seconds and browser opens new one, so threads aren't kept forever
+        "EVENTS_STREAM_SECONDS": int(os.environ.get("EVENTS_STREAM_SECONDS", 300)),
+        # method with number of iterations, passwords hashed with other parameters are hashed again on login
+        "PASSWORD_HASH_METHOD": os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2:sha256:260000"),
+        "PASSWORD_SALT_LENGTH": int(os.environ.get("PASSWORD_SALT_LENGTH", 16)),
+        # number of passwords hashed at once (in separate processes) and number of passwords that can wait for it
+        "PASSWORD_HASH_WORKERS": int(os.environ.get("PASSWORD_HASH_WORKERS", 2)),
+        "PASSWORD_HASH_QUEUE": int(os.environ.get("PASSWORD_HASH_QUEUE", 4)),
+        "MAIL_USERNAME": mail_username,
+        "MAIL_PASSWORD": os.environ.get("MAIL_PASSWORD"),
+        "MAIL_DEFAULT_SENDER": os.environ.get("MAIL_DEFAULT_SENDER", mail_username),
+        "MAIL_PORT": int(os.environ.get("MAIL_PORT", 587)),
+        "MAIL_SERVER": os.environ.get("MAIL_SERVER", "smtp.gmail.com"),
+        "MAIL_USE_TLS": env_flag("MAIL_USE_TLS", True),
+        # emails (password recovery) are sent only if it's turned on
+        "MAIL_ENABLED": env_flag("MAIL_ENABLED", False),
+        "MAIL_QUEUE_SIZE": int(os.environ.get("MAIL_QUEUE_SIZE", 100)),
+        "MAIL_BATCH_SIZE": int(os.environ.get("MAIL_BATCH_SIZE", 20)),
+        "MAIL_RETRIES": int(os.environ.get("MAIL_RETRIES", 3)),
+        # daily emails about deadlines sent from gunicorn workers, or run "flask notify-deadlines" instead
+        "DEADLINE_SCHEDULER": env_flag("DEADLINE_SCHEDULER", False),
+        # avatars from Gravatar are downloaded once and served from disk, browsers keep them for AVATAR_MAX_AGE seconds
+        "AVATAR_CACHE_DIR": os.environ.get("AVATAR_CACHE_DIR", os.path.join(instance_path, "avatars")),
+        "AVATAR_CACHE_SIZE": int(os.environ.get("AVATAR_CACHE_SIZE", 50 * 1024 * 1024)),
+        "AVATAR_UPSTREAM": os.environ.get("AVATAR_UPSTREAM", "https://www.gravatar.com/avatar/"),
+        "AVATAR_MAX_AGE": int(os.environ.get("AVATAR_MAX_AGE", 7 * 24 * 3600)),
+    }
+
+
+def engine_options(database_uri):
+    """SQLAlchemy engine and connection pool options for given database.
+    Pool size should be at least the number of threads of one app worker (GUNICORN_THREADS)."""
+    options = {
+        # check connection before using it, DB (or Heroku) can close idle ones
+        "pool_pre_ping": env_flag("DB_POOL_PRE_PING", True),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),
+    }
+    # SQLite doesn't use pool of fixed size
+    if not database_uri.startswith("sqlite"):
+        options["pool_size"] = int(os.environ.get("DB_POOL_SIZE", 5))
+        options["max_overflow"] = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+        options["pool_timeout"] = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+    return options
@@ -0,0 +1,130 @@
+"""Daily deadline notifications. Task status comes from its deadline and changes only when date changes, so once
+a day statuses of all tasks are compared with the ones users were last notified about ("Task.notified_status"),
+and every user gets one email with their tasks which got close to deadline or went past it.
+
+Run it with "flask notify-deadlines" (e.g. from Heroku Scheduler) or by "DeadlineScheduler" in background thread.
+To try it locally, run SMTP server printing messages, e.g. "python -m aiosmtpd -n -l localhost:8025",
+set MAIL_ENABLED=1, MAIL_SERVER=localhost, MAIL_PORT=8025, MAIL_USE_TLS=0 and pick date with "--date"."""
+import logging
+import smtplib
+import threading
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import func, or_
+
+from extensions import db, get_mail_dispatcher
+from models import Project, Task, User, user_task, status_case
+
+logger = logging.getLogger(__name__)
+
+# users are notified when their task gets one of these statuses
+NOTIFIED_STATUSES = ("deadline_warning", "deadline_passed")
+
+
+def record_status_changes(today=None):
+    """Saves current status of every task whose status changed since last time, with one UPDATE.
+    Returns tasks which got notified status, for each of their users as {(email, name): [(title, project, deadline,
+    status)]}, or None if the same changes were just recorded by other process (then they're left to it)."""
+    status = status_case(Task.task_done, Task.deadline, today)
+    changed = or_(Task.notified_status.is_(None), Task.notified_status != status)
+    changed_count = db.session.query(func.count(Task.id)).filter(changed).scalar()
+    tasks = db.session.query(User.email, User.name, Task.title, Project.name, Task.deadline, status) \
+        .join(user_task, user_task.c.user_id == User.id) \
+        .join(Task, Task.id == user_task.c.task_id) \
+        .outerjoin(Project, Project.id == Task.project_id) \
+        .filter(changed, status.in_(NOTIFIED_STATUSES)) \
+        .order_by(User.id, Task.deadline, Task.id)
+    digests = {}
+    for email, name, *task in tasks:
+        digests.setdefault((email, name), []).append(tuple(task))
+    updated = Task.query.filter(changed).update({Task.notified_status: status}, synchronize_session=False)
+    # rows updated by other transaction in the meantime are skipped by UPDATE
+    if updated < changed_count:
+        db.session.rollback()
+        return None
+    db.session.commit()
+    return digests
+
+
+def digest_message(email, name, tasks):
+    # mail is rarely used, so it's imported only when needed
+    from flask_mail import Message
+    lines = [f"Hello {name},", ""]
+    for status, label in [("deadline_passed", "Deadline has passed:"), ("deadline_warning", "Deadline is close:")]:
+        with_status = [task for task in tasks if task[3] == status]
+        if with_status:
+            lines.append(label)
+            lines += [f"  - {title} ({project}), deadline {deadline:%Y-%m-%d}"
+                      for title, project, deadline, _ in with_status]
+            lines.append("")
+    message = Message("'Project Manager App' deadlines of your tasks", recipients=[email])
+    message.body = "\n".join(lines)
+    return message
+
+
+def send_digests(digests):
+    """Sends digest to every user over one SMTP connection. Returns number of sent emails."""
+    if not digests:
+        return 0
+    if not current_app.config["MAIL_ENABLED"]:
+        logger.info("Mail is turned off, %s deadline digests not sent.", len(digests))
+        return 0
+    sent = 0
+    try:
+        with get_mail_dispatcher().mail.connect() as connection:
+            for (email, name), tasks in digests.items():
+                connection.send(digest_message(email, name, tasks))
+                sent += 1
+    except (smtplib.SMTPException, OSError):
+        logger.exception("Sending deadline digests failed, %s of %s sent.", sent, len(digests))
+    return sent
+
+
+def notify_deadlines(today=None):
+    """Records status changes and notifies users about them. Returns number of users to notify and of sent emails.
+    Changes are recorded before sending, so nobody gets the same digest twice, even if sending fails."""
+    digests = record_status_changes(today)
+    if digests is None:
+        return 0, 0
+    return len(digests), send_digests(digests)
+
+
+class DeadlineScheduler:
+    """Runs "notify_deadlines" from background thread, every "interval" seconds checks if date (from "clock",
+    which can be frozen in tests) changed since last run. Run which fails is tried again after "interval"."""
+
+    def __init__(self, app, clock=date.today, interval=60):
+        self.app = app
+        self.clock = clock
+        self.interval = interval
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="deadline-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run_pending(self):
+        """Notifies users if it wasn't done for current date yet. Returns result of "notify_deadlines" or None."""
+        today = self.clock()
+        if today == self.last_run:
+            return None
+        with self.app.app_context():
+            result = notify_deadlines(today)
+        self.last_run = today
+        return result
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception:
+                logger.exception("Deadline notifications failed.")
+            self._stop.wait(self.interval)
@@ -0,0 +1,171 @@
+"""Changes of tasks, projects and users pushed to open main pages with Server-Sent Events ("/events").
+
+Views add events to DB session with "queue_event", they're published only when session is committed. Every app process
+has its own "EventBroker", which gives events to streams of its clients. With "PostgresEventBroker" events go through
+PostgreSQL NOTIFY, so clients connected to any gunicorn worker (or server) get changes made in every other one.
+
+Each open stream keeps one worker thread busy, so they're turned off by default (EVENTS_ENABLED) and best used
+with "gevent" workers."""
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, text
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "project_manager_events"
+
+
+def queue_event(event_type, project_id=None, user_id=None, name=None):
+    """Event published when current DB transaction is committed: "changed", "added" or "deleted" project,
+    or "user" whose project or tasks changed. Renamed project is "changed" with its new "name"."""
+    if current_app.config["EVENTS_ENABLED"]:
+        queued_event = {"type": event_type, "project_id": project_id, "user_id": user_id}
+        if name is not None:
+            queued_event["name"] = name
+        db.session.info.setdefault("events", []).append(queued_event)
+
+
+@event.listens_for(db.session, "after_commit")
+def _publish_queued_events(session):
+    events = session.info.pop("events", None)
+    if events:
+        from extensions import get_event_broker
+        broker = get_event_broker()
+        # the same change can be queued many times in one transaction
+        unique_events = {json.dumps(queued_event, sort_keys=True): queued_event for queued_event in events}
+        for queued_event in unique_events.values():
+            broker.publish(queued_event)
+
+
+@event.listens_for(db.session, "after_soft_rollback")
+def _drop_queued_events(session, previous_transaction):
+    session.info.pop("events", None)
+
+
+class Subscription:
+    """Events for one client. If client doesn't read them fast enough, it's marked as "overflowed"
+    and should load the whole page again."""
+
+    def __init__(self, max_size):
+        self.events = queue.Queue(maxsize=max_size)
+        self.overflowed = False
+
+    def get(self, timeout):
+        """Next event, or None if there wasn't any in "timeout" seconds."""
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBroker:
+    """In-process publish-subscribe, events are seen only by clients connected to the same process."""
+
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(self.max_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, change):
+        self._deliver(change)
+
+    def _deliver(self, change):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.events.put_nowait(change)
+            except queue.Full:
+                subscription.overflowed = True
+
+
+class PostgresEventBroker(EventBroker):
+    """Events are sent with NOTIFY and every process gets them from its own connection with LISTEN, started
+    in background thread with first subscription (and again after fork)."""
+
+    def __init__(self, engine, max_size=100, reconnect_delay=5.0):
+        super().__init__(max_size)
+        self.engine = engine
+        self.reconnect_delay = reconnect_delay
+        self._listener_pid = None
+
+    def subscribe(self):
+        with self._lock:
+            if self._listener_pid != os.getpid():
+                threading.Thread(target=self._listen, name="event-listener", daemon=True).start()
+                self._listener_pid = os.getpid()
+        return super().subscribe()
+
+    def publish(self, change):
+        with self.engine.begin() as connection:
+            connection.execute(text("SELECT pg_notify(:channel, :payload)"),
+                               {"channel": CHANNEL, "payload": json.dumps(change)})
+
+    def _listen(self):
+        while True:
+            # connection is taken out of pool, it's used only for listening
+            connection = None
+            try:
+                connection = self.engine.raw_connection()
+                connection.detach()
+                dbapi_connection = connection.connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {CHANNEL}")
+                while True:
+                    if select.select([dbapi_connection], [], [], 60) == ([], [], []):
+                        continue
+                    dbapi_connection.poll()
+                    while dbapi_connection.notifies:
+                        self._deliver(json.loads(dbapi_connection.notifies.pop(0).payload))
+            except Exception:
+                logger.exception("Listening for events failed, connecting again in %s s.", self.reconnect_delay)
+                if connection is not None:
+                    connection.close()
+                time.sleep(self.reconnect_delay)
+
+
+def visible_to(change, manager, project_id, user_id):
+    """Changes of user are seen only by that user, changes of projects by managers and users of the project."""
+    if change["user_id"] is not None:
+        return change["user_id"] == user_id
+    return manager or change["project_id"] == project_id
+
+
+def event_stream(broker, manager, project_id, user_id, keepalive=15, duration=300):
+    """Server-Sent Events for one client. Stream ends after "duration" seconds, so worker thread isn't kept forever,
+    browser connects again by itself. Comment is sent every "keepalive" seconds, so proxies don't close it."""
+    subscription = broker.subscribe()
+    try:
+        yield "retry: 3000\n\n"
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            change = subscription.get(timeout=keepalive)
+            if subscription.overflowed:
+                yield f"data: {json.dumps({'type': 'reload'})}\n\n"
+                return
+            if change is None:
+                yield ": keepalive\n\n"
+            elif visible_to(change, manager, project_id, user_id):
+                yield f"data: {json.dumps(change)}\n\n"
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,104 @@
+"""Extensions and services shared by the whole app.
+
+Flask extensions are created here and bound to app in "create_app". Services configured from app settings
+(password hashing, mail, caches) are created on first use and kept in "app.extensions", so starting app
+(every worker, test and CLI command) doesn't pay for the ones it never uses."""
+import threading
+
+from flask import current_app
+from flask_bootstrap import Bootstrap
+from flask_login import LoginManager
+from flask_sqlalchemy import SQLAlchemy
+
+db = SQLAlchemy()
+login_manager = LoginManager()
+bootstrap = Bootstrap()
+
+_services_lock = threading.Lock()
+
+
+def init_migrate(app):
+    """Binds Flask-Migrate to app, for "flask db" commands. Alembic is slow to import, so only CLI does it."""
+    from flask_migrate import Migrate
+    # batch mode lets migrations alter tables also on SQLite
+    Migrate(app, db, render_as_batch=True)
+
+
+def lazy_service(name, create):
+    """Service of current app with given name, made with "create(app)" when it's needed first time."""
+    app = current_app._get_current_object()
+    service = app.extensions.get(name)
+    if service is None:
+        with _services_lock:
+            service = app.extensions.get(name)
+            if service is None:
+                service = app.extensions[name] = create(app)
+    return service
+
+
+def get_password_hasher():
+    def create(app):
+        from hashing import PasswordHasher
+        return PasswordHasher(method=app.config["PASSWORD_HASH_METHOD"],
+                              salt_length=app.config["PASSWORD_SALT_LENGTH"],
+                              workers=app.config["PASSWORD_HASH_WORKERS"],
+                              queue_size=app.config["PASSWORD_HASH_QUEUE"])
+    return lazy_service("password_hasher", create)
+
+
+def get_mail_dispatcher():
+    """Emails are sent from background thread, so requests don't wait for SMTP server."""
+    def create(app):
+        from flask_mail import Mail
+        from mail_queue import MailDispatcher
+        return MailDispatcher(app, Mail(app),
+                              queue_size=app.config["MAIL_QUEUE_SIZE"],
+                              batch_size=app.config["MAIL_BATCH_SIZE"],
+                              retries=app.config["MAIL_RETRIES"])
+    return lazy_service("mail_dispatcher", create)
+
+
+def get_avatar_cache():
+    def create(app):
+        from avatar import AvatarCache
+        return AvatarCache(directory=app.config["AVATAR_CACHE_DIR"],
+                           max_bytes=app.config["AVATAR_CACHE_SIZE"],
+                           upstream=app.config["AVATAR_UPSTREAM"],
+                           size=50,
+                           default="robohash",
+                           rating="r")
+    return lazy_service("avatar_cache", create)
+
+
+def get_principal_cache():
+    """Logged in users, see "views.auth.load_user"."""
+    def create(app):
+        from cache import TTLCache
+        return TTLCache(ttl=app.config["PRINCIPAL_CACHE_TTL"])
+    return lazy_service("principal_cache", create)
+
+
+def get_choices_cache():
+    """Choices of selection forms, see "helpers.choices"."""
+    def create(app):
+        from cache import TTLCache
+        return TTLCache(ttl=app.config["CHOICES_CACHE_TTL"])
+    return lazy_service("choices_cache", create)
+
+
+def get_event_broker():
+    """Changes pushed to open main pages, see "events.py"."""
+    def create(app):
+        from events import EventBroker, PostgresEventBroker
+        if app.config["EVENTS_BACKEND"] == "postgres":
+            return PostgresEventBroker(db.engine, max_size=app.config["EVENTS_QUEUE_SIZE"])
+        return EventBroker(max_size=app.config["EVENTS_QUEUE_SIZE"])
+    return lazy_service("event_broker", create)
+
+
+def get_fragment_cache():
+    """Rendered first page of tasks of each project, see "helpers.project_boards"."""
+    def create(app):
+        from cache import FragmentCache
+        return FragmentCache(max_bytes=app.config["FRAGMENT_CACHE_SIZE"])
+    return lazy_service("fragment_cache", create)
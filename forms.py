@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired
 from wtforms import StringField, SubmitField, PasswordField, SelectMultipleField, widgets, DateField, HiddenField, \
     SelectField, EmailField
 from wtforms.validators import DataRequired
@@ -89,3 +90,9 @@ class ChangePassword(FlaskForm):
 class PasswordRecovery(FlaskForm):
     email = EmailField("Email", validators=[DataRequired()])
     submit = SubmitField("Reset Password")
+
+
+# --- IMPORT
+class ImportData(FlaskForm):
+    file = FileField("JSON Lines or CSV file", validators=[FileRequired()])
+    submit = SubmitField("Import")
@@ -0,0 +1,42 @@
+"""Gunicorn settings, each of them can be changed with environment variable."""
+import multiprocessing
+import os
+from config import env_flag
+
+# "sync" (one request at a time per worker), "gthread" (threads in every worker)
+# or "gevent" (needs "gevent" and "psycogreen" installed)
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+# Heroku sets WEB_CONCURRENCY depending on dyno size
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4 if worker_class == "gthread" else 1))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+# app is imported once in master process and workers are forked from it, so they start faster and share memory
+preload_app = env_flag("GUNICORN_PRELOAD", True)
+
+
+def pre_fork(server, worker):
+    # with preloaded app, DB connections opened in master process would be shared by all workers,
+    # so they are closed before forking, while no worker uses them. Without preloading master has no app
+    # and it isn't loaded here, so every worker loads its own.
+    if server.cfg.preload_app:
+        from extensions import db
+        with server.app.wsgi().app_context():
+            db.engine.dispose()
+
+
+def post_worker_init(worker):
+    if worker_class == "gevent":
+        # without it, waiting for PostgreSQL blocks the whole gevent worker
+        try:
+            from psycogreen.gevent import patch_psycopg
+        except ImportError:
+            raise RuntimeError('GUNICORN_WORKER_CLASS=gevent needs "gevent" and "psycogreen" packages, '
+                               'install them with "pip install gevent psycogreen"') from None
+        patch_psycopg()
+    # every worker checks deadlines, so they're sent also after any worker restarts, changes recorded by one of them
+    # are skipped by others (see "deadlines.record_status_changes"), so every user still gets one email
+    app = worker.wsgi
+    if app.config["DEADLINE_SCHEDULER"]:
+        from deadlines import DeadlineScheduler
+        DeadlineScheduler(app).start()
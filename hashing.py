@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+def hash_passwords(passwords, method, salt_length):
+    """Hashes list of passwords in one worker process, so they're sent to it at once."""
+    return [generate_password_hash(password, method, salt_length) for password in passwords]
+
+
+class HashingBusy(Exception):
+    """Raised when the limit of passwords being hashed (and waiting for it) at once is reached,
+    or when waiting for hash takes longer than timeout."""
+
+
+class PasswordHasher:
+    """Hashes and checks passwords in pool of separate processes, so CPU heavy hashing doesn't hold request threads
+    and number of hashes computed at once is limited. When limit of running and waiting hashes is reached,
+    next one is rejected right away with HashingBusy. With "workers" 0 passwords are hashed in calling thread."""
+
+    def __init__(self, method, salt_length, workers, queue_size, timeout=30):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    def _get_executor(self):
+        # pool is started lazily and again after fork, so every app worker process has its own
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _submit(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._get_executor().submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # slot is freed when hashing really ends, not when waiting for it times out
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    @staticmethod
+    def _result(future, timeout):
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # pool is saturated, request gets the same fast answer as when no slot is free
+            raise HashingBusy() from None
+
+    def _run(self, function, *args):
+        if self.workers == 0:
+            return function(*args)
+        return self._result(self._submit(function, *args), self.timeout)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def hash_many(self, passwords):
+        """Hashes passwords (e.g. of imported users) split into one part for each worker, so all of them hash
+        in parallel. Every part takes one slot, and gets as much time as its passwords hashed one by one."""
+        passwords = list(passwords)
+        if self.workers == 0 or not passwords:
+            return hash_passwords(passwords, self.method, self.salt_length)
+        part_size = -(-len(passwords) // self.workers)
+        parts = [passwords[start:start + part_size] for start in range(0, len(passwords), part_size)]
+        futures = [self._submit(hash_passwords, part, self.method, self.salt_length) for part in parts]
+        return [pwhash for future, part in zip(futures, parts)
+                for pwhash in self._result(future, self.timeout * len(part))]
+
+    def check(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Checks if hash was made with other method, number of iterations or salt length than current ones."""
+        # hash format is "method$salt$hash", e.g. "pbkdf2:sha256:260000$salt$hash"
+        method, salt, _ = pwhash.split("$", 2)
+        return method != self.method or len(salt) != self.salt_length
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,400 @@
+"""Functions used by many views: main page tasks, choices of selection forms, users assignment, statistics."""
+import re
+from collections import Counter
+from datetime import date
+
+from flask import current_app, request, render_template, redirect, url_for, Response, stream_with_context
+from flask_login import current_user
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
+from sqlalchemy import literal, literal_column, func, and_, or_, select, exists, table, column, union_all, \
+    tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import selectinload
+
+from events import queue_event
+from extensions import db, get_choices_cache, get_fragment_cache, get_principal_cache
+from forms import UserSelectionField
+from models import Project, User, Task, ProjectStats, UserStats, user_task, SEARCH_COLUMNS, search_vector
+
+# main page is shown in pages, so its size doesn't grow with number of projects and tasks
+PROJECTS_PER_PAGE = 10
+TASKS_PER_PAGE = 20
+# number of template pieces sent at once when streaming page
+STREAM_BUFFER_SIZE = 50
+
+
+def stream_template(template_name, **context):
+    """Renders template in chunks while response is being sent, same as "stream_template" in newer Flask."""
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    template_stream = app.jinja_env.get_template(template_name).stream(context)
+    # don't send every small piece of template as separate chunk
+    template_stream.enable_buffering(STREAM_BUFFER_SIZE)
+    return Response(stream_with_context(template_stream))
+
+
+def dashboard_tasks(project_ids, hide_done=None, after=None):
+    """Returns page of tasks for each project (ordered by id, starting after given task id)
+    together with information if there are more tasks to load."""
+    if not project_ids:
+        return {}
+    # every project takes only its page from index on (project_id, id), one task more than page size,
+    # just to check if there is anything left, pages of all projects are read with one query
+    pages = []
+    for project_id in project_ids:
+        page = select(Task.id).where(Task.project_id == project_id)
+        if hide_done:
+            page = page.where(Task.task_done.isnot(True))
+        if after is not None:
+            page = page.where(Task.id > after)
+        page = page.order_by(Task.id).limit(TASKS_PER_PAGE + 1).subquery()
+        pages.append(select(page.c.id))
+    tasks_page = union_all(*pages).subquery() if len(pages) > 1 else pages[0].subquery()
+    tasks = Task.query.join(tasks_page, Task.id == tasks_page.c.id) \
+        .options(selectinload(Task.involved_users)) \
+        .order_by(Task.project_id, Task.id)
+    project_tasks = {project_id: [] for project_id in project_ids}
+    for task in tasks:
+        project_tasks[task.project_id].append(task)
+    return {project_id: (tasks[:TASKS_PER_PAGE], len(tasks) > TASKS_PER_PAGE)
+            for project_id, tasks in project_tasks.items()}
+
+
+# CSRF token is different for each session, it's stored in cached fragments as this placeholder
+CSRF_PLACEHOLDER = "__csrf_token__"
+
+
+def bump_project_versions(project_ids):
+    """Marks projects (given by IDs or select of IDs) as changed, so their cached tasks aren't shown anymore.
+    It's done in the same transaction as the change, so every app process sees it at once.
+    Open main pages showing these projects are told to load them again, after commit."""
+    if current_app.config["EVENTS_ENABLED"]:
+        if not isinstance(project_ids, (list, tuple, set)):
+            project_ids = [project_id for project_id, in
+                           db.session.query(Project.id).filter(Project.id.in_(project_ids))]
+        for project_id in project_ids:
+            queue_event("changed", project_id=project_id)
+    Project.query.filter(Project.id.in_(project_ids)) \
+        .update({Project.version: Project.version + 1}, synchronize_session=False)
+
+
+def may_set_done(task, done):
+    """Task can be set done by manager or by users assigned to it, but undone only by manager."""
+    if current_user.position == "manager":
+        return True
+    return done and task.id in current_user.task_ids
+
+
+def set_task_done(task, done):
+    """Sets task (loaded with its users) done or undone, together with its statistics and project version.
+    Changes are committed by caller."""
+    stats_before = task_stats(task)
+    task.task_done = done
+    update_stats(stats_before, task_stats(task))
+    bump_project_versions([task.project_id])
+
+
+def project_boards(projects, hide_done=None, form=None):
+    """Returns first page of tasks for each project, rendered for current user, as iterator of (project, HTML).
+    Projects not changed since they were last rendered are taken from cache, tasks of others are read from DB
+    right away, in one query. Each board is rendered only when it's taken, so streamed page sends first projects
+    before the rest is rendered."""
+    # tasks look different for manager and for each user, and their status changes with date. User sees
+    # DONE buttons of own tasks, which other processes can change, so they're part of key, not only user's ID
+    viewer = "manager" if current_user.position == "manager" else (current_user.id, current_user.task_ids)
+    keys = {project.id: (project.id, project.created_at, project.version, viewer, bool(hide_done), date.today())
+            for project in projects}
+    csrf_token = generate_csrf()
+    fragment_cache = get_fragment_cache()
+    fragments = {project_id: fragment_cache.get(key) for project_id, key in keys.items()}
+    changed_tasks = dashboard_tasks([project_id for project_id, fragment in fragments.items() if fragment is None],
+                                    hide_done=hide_done)
+
+    def boards():
+        for project in projects:
+            fragment = fragments[project.id]
+            if fragment is not None:
+                yield project, Markup(fragment.replace(CSRF_PLACEHOLDER, csrf_token))
+                continue
+            tasks, more_tasks = changed_tasks[project.id]
+            fragment = render_template("project_board.html", project_id=project.id, tasks=tasks,
+                                       more_tasks=more_tasks, hide_done=hide_done, form=form)
+            fragment_cache.set(keys[project.id], fragment.replace(csrf_token, CSRF_PLACEHOLDER))
+            yield project, Markup(fragment)
+
+    return boards()
+
+
+def select_project(next_endpoint):
+    """Used for project selection in project or task edit, chosen project is sent to view "next_endpoint"
+    (edit project, add task etc.) as its "project_id"."""
+    form = UserSelectionField()
+    # blank choice for empty selection in selection field
+    form.selection_id.choices = [("", "")] + choices("projects")
+    if form.validate_on_submit():
+        return redirect(url_for(next_endpoint, project_id=form.selection_id.data))
+    return render_template("selection_form.html", form=form, selection_goal="project")
+
+
+def users_selection(form, selection_type, project_id, task_id=None):
+    """Depending on context, shows users without project, task or users currently on project or task"""
+    empty_selection = [("", "")]
+    # only ID and name are needed for choices, so don't load whole users
+    users_without_a_project = db.session.query(User.id, User.name).filter(User.project_id.is_(None))
+    users_on_current_project = db.session.query(User.id, User.name).filter(User.project_id == project_id)
+    form.occupied_users.choices = empty_selection
+    form.free_users.choices = empty_selection
+    # from every project and task exclude managers as available to assign
+    # for new project, show only users not assigned to any project
+    if selection_type == "add_project":
+        form.free_users.choices = user_choices(users_without_a_project.filter(User.position != "manager"))
+        return form
+    # for project editing show users currently on project (to delete them)
+    # or users not assigned to any project (to add them)
+    elif selection_type == "edit_project":
+        form.occupied_users.choices = user_choices(users_on_current_project)
+        form.free_users.choices = user_choices(users_without_a_project.filter(User.position != "manager"))
+        return form
+    # for new task show users currently on project related to task
+    elif selection_type == "add_task":
+        form.free_users.choices = user_choices(users_on_current_project.filter(User.position != "manager"))
+        return form
+    # for project editing show users currently on project related to task, either assigned to other tasks or not
+    elif selection_type == "edit_task":
+        assigned_to_task = exists().where(user_task.c.user_id == User.id, user_task.c.task_id == task_id)
+        form.occupied_users.choices = user_choices(db.session.query(User.id, User.name).filter(assigned_to_task))
+        form.free_users.choices = user_choices(users_on_current_project
+                                               .filter(User.position != "manager", ~assigned_to_task))
+        return form
+
+
+def user_choices(users_query):
+    """Choices for users selection field from query of users IDs and names."""
+    return [(str(user_id), name) for user_id, name in users_query]
+
+
+# --- CHOICES OF SELECTION FORMS
+# only ID and name of rows are read for choices, by kind of choices
+CHOICE_QUERIES = {
+    "projects": lambda: db.session.query(Project.id, Project.name).order_by(Project.id),
+    "users": lambda: db.session.query(User.id, User.name).order_by(User.id),
+    "tasks": lambda project_id: db.session.query(Task.id, Task.title)
+    .filter(Task.project_id == project_id).order_by(Task.id),
+}
+
+
+def choices(kind, *arguments):
+    """Choices of selection field: all "projects", all "users" or "tasks" of project given by ID, as [(ID, name)].
+    They're cached in each app process until they're changed (see "invalidate_choices") or expire.
+    Sent forms are checked against choices read from DB, so rows just added by other process can be chosen."""
+    key = (kind, *arguments)
+    choices_cache = get_choices_cache()
+    cached = None if request.method == "POST" else choices_cache.get(key)
+    if cached is None:
+        cached = tuple((str(row_id), name) for row_id, name in CHOICE_QUERIES[kind](*arguments))
+        choices_cache.set(key, cached)
+    return list(cached)
+
+
+def invalidate_choices(*keys):
+    """Drops cached choices after rows are added, renamed or deleted, keys are given like (kind, *arguments)."""
+    get_choices_cache().invalidate(*keys)
+
+
+def insert_ignoring_duplicates(table):
+    """INSERT statement which skips rows that are already in table, on DBs that support "ON CONFLICT DO NOTHING"."""
+    if db.engine.dialect.name == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    elif db.engine.dialect.name == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return table.insert()
+
+
+# --- USERS TABLE
+USERS_PER_PAGE = 50
+# columns users table can be sorted by, users with the same value are sorted by ID
+USER_SORT_COLUMNS = {
+    "name": User.name,
+    "email": User.email,
+    "position": User.position,
+    "project": Project.name,
+    "tasks": func.count(user_task.c.task_id),
+}
+
+
+def users_table(project=None, position=None, sort="name", descending=False, page=1):
+    """Page of users (starting from 1) as rows with ID, name, email, position, project name and number of tasks,
+    read with one query, and number of all users matching filters. "project" is project ID or "none" for users
+    without project."""
+    filters = []
+    if project == "none":
+        filters.append(User.project_id.is_(None))
+    elif project:
+        filters.append(User.project_id == int(project))
+    if position:
+        filters.append(User.position == position)
+    sort_column = USER_SORT_COLUMNS.get(sort, User.name)
+    users = db.session.query(User.id, User.name, User.email, User.position, Project.name.label("project_name"),
+                             USER_SORT_COLUMNS["tasks"].label("task_count")) \
+        .outerjoin(Project, Project.id == User.project_id) \
+        .outerjoin(user_task, user_task.c.user_id == User.id) \
+        .filter(*filters) \
+        .group_by(User.id, Project.id) \
+        .order_by(sort_column.desc() if descending else sort_column, User.id) \
+        .offset((page - 1) * USERS_PER_PAGE) \
+        .limit(USERS_PER_PAGE) \
+        .all()
+    total = db.session.query(func.count(User.id)).filter(*filters).scalar()
+    return users, total
+
+
+# --- SEARCH
+SEARCH_PER_PAGE = 20
+# longer searches don't find anything more, but cost more
+SEARCH_MAX_WORDS = 10
+
+
+def search_words(text):
+    """Words of searched text, each of them finds also longer words starting with it."""
+    return re.findall(r"\w+", text.lower())[:SEARCH_MAX_WORDS]
+
+
+def search(query, model, words):
+    """Filters and orders query of "model" (Task or User) by full-text index of its searched columns, best first.
+    All words have to be found. On databases other than SQLite and PostgreSQL it's done without index."""
+    table_name = model.__tablename__
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        fts = table(f"{table_name}_fts", column("rowid"))
+        match = literal_column(f"{table_name}_fts").op("MATCH")(" ".join(f'"{word}"*' for word in words))
+        return query.join(fts, fts.c.rowid == model.id).filter(match) \
+            .order_by(func.bm25(literal_column(f"{table_name}_fts")), model.id)
+    if dialect == "postgresql":
+        vector = literal_column(search_vector(table_name))
+        ts_query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{word}:*" for word in words))
+        return query.filter(vector.op("@@")(ts_query)) \
+            .order_by(func.ts_rank(vector, ts_query).desc(), model.id)
+    columns = [getattr(model, name) for name in SEARCH_COLUMNS[table_name]]
+    return query.filter(and_(*[or_(*[column_.ilike(f"%{word}%") for column_ in columns]) for word in words])) \
+        .order_by(model.id)
+
+
+def search_page(query, page):
+    """Page of search results (starting from 1) and information if there are more of them."""
+    results = query.offset((page - 1) * SEARCH_PER_PAGE).limit(SEARCH_PER_PAGE + 1).all()
+    return results[:SEARCH_PER_PAGE], len(results) > SEARCH_PER_PAGE
+
+
+# --- STATISTICS
+# tasks without deadline are counted as never late
+NO_DEADLINE = date.max
+
+
+def stats_snapshot(task_ids=None, user_ids=None):
+    """Counts tasks (with given IDs, or assigned to given users) the same way statistics tables do,
+    as {(table, project or user ID, deadline, task done): number of tasks}.
+    Comparing snapshots taken before and after change gives what has to be changed in statistics."""
+    deadline = func.coalesce(Task.deadline, literal(NO_DEADLINE, db.Date))
+    task_done = Task.task_done.is_(True)
+    snapshot = Counter()
+    if task_ids is not None:
+        projects = db.session.query(Task.project_id, deadline, task_done, func.count()) \
+            .filter(Task.id.in_(task_ids), Task.project_id.isnot(None)) \
+            .group_by(Task.project_id, deadline, task_done)
+        for project_id, task_deadline, done, task_count in projects:
+            snapshot[(ProjectStats.__table__, project_id, task_deadline, bool(done))] += task_count
+    users = db.session.query(user_task.c.user_id, deadline, task_done, func.count()) \
+        .join(Task, Task.id == user_task.c.task_id)
+    if task_ids is not None:
+        users = users.filter(Task.id.in_(task_ids))
+    if user_ids is not None:
+        users = users.filter(user_task.c.user_id.in_(user_ids))
+    for user_id, task_deadline, done, task_count in users.group_by(user_task.c.user_id, deadline, task_done):
+        snapshot[(UserStats.__table__, user_id, task_deadline, bool(done))] += task_count
+    return snapshot
+
+
+def task_stats(task):
+    """The same as "stats_snapshot" of one task, counted from task already loaded with its users, without queries."""
+    deadline = task.deadline or NO_DEADLINE
+    task_done = bool(task.task_done)
+    snapshot = Counter()
+    if task.project_id is not None:
+        snapshot[(ProjectStats.__table__, task.project_id, deadline, task_done)] += 1
+    for user in task.involved_users:
+        snapshot[(UserStats.__table__, user.id, deadline, task_done)] += 1
+    return snapshot
+
+
+def update_stats(before, after):
+    """Adds to statistics tables the difference between snapshots, one statement for each table."""
+    difference = Counter(after)
+    difference.subtract(before)
+    for table, id_column in [(ProjectStats.__table__, "project_id"), (UserStats.__table__, "user_id")]:
+        rows = [{id_column: row_id, "deadline": deadline, "task_done": task_done, "task_count": task_count}
+                for (row_table, row_id, deadline, task_done), task_count in difference.items()
+                if row_table is table and task_count != 0]
+        if not rows:
+            continue
+        if db.engine.dialect.name == "postgresql":
+            insert = postgresql.insert(table)
+        else:
+            insert = sqlite.insert(table)
+        insert = insert.on_conflict_do_update(index_elements=[id_column, "deadline", "task_done"],
+                                              set_={"task_count": table.c.task_count + insert.excluded.task_count})
+        db.session.execute(insert, rows)
+        # rows without tasks aren't needed, only rows just made smaller can be left without them
+        decreased = [(row[id_column], row["deadline"], row["task_done"]) for row in rows if row["task_count"] < 0]
+        if decreased:
+            key = tuple_(table.c[id_column], table.c.deadline, table.c.task_done)
+            db.session.execute(table.delete().where(key.in_(decreased), table.c.task_count <= 0))
+
+
+def rebuild_stats():
+    """Replaces statistics with ones counted from all tasks."""
+    ProjectStats.query.delete()
+    UserStats.query.delete()
+    update_stats({}, stats_snapshot(task_ids=select(Task.id)))
+
+
+# --- CHANGING USER ASSIGNMENT IN DB
+def change_users(add_users=(), remove_users=(), task=None, project=None):
+    """Adds users to and removes them from task or project, with few statements for all users in one transaction.
+    Users already assigned (or not assigned) as requested are not touched. Project of the task (or projects of tasks
+    of changed users) is marked as changed."""
+    add_users = {int(user_id) for user_id in add_users if user_id}
+    remove_users = {int(user_id) for user_id in remove_users if user_id}
+    stats_before = stats_snapshot(user_ids=add_users | remove_users)
+    if task is not None:
+        bump_project_versions([task.project_id])
+    elif remove_users:
+        bump_project_versions(select(Task.project_id).join(user_task, user_task.c.task_id == Task.id)
+                              .where(user_task.c.user_id.in_(remove_users)))
+    if task is not None:
+        if remove_users:
+            db.session.execute(user_task.delete().where(user_task.c.task_id == task.id,
+                                                        user_task.c.user_id.in_(remove_users)))
+        if add_users:
+            already_assigned = {user_id for user_id, in db.session.query(user_task.c.user_id)
+                                .filter(user_task.c.task_id == task.id, user_task.c.user_id.in_(add_users))}
+            new_assignments = [{"user_id": user_id, "task_id": task.id} for user_id in add_users - already_assigned]
+            if new_assignments:
+                db.session.execute(insert_ignoring_duplicates(user_task), new_assignments)
+    if project is not None:
+        if remove_users:
+            leaving_users = select(User.id).where(User.id.in_(remove_users), User.project_id == project.id)
+            # user removed from project is also removed from all of its tasks
+            db.session.execute(user_task.delete().where(user_task.c.user_id.in_(leaving_users)))
+            User.query.filter(User.id.in_(leaving_users)).update({User.project_id: None}, synchronize_session=False)
+        if add_users:
+            User.query.filter(User.id.in_(add_users), or_(User.project_id.is_(None), User.project_id != project.id)) \
+                .update({User.project_id: project.id}, synchronize_session=False)
+    if project is not None:
+        # users moved to or from project see other tasks now
+        for user_id in add_users | remove_users:
+            queue_event("user", user_id=user_id)
+    update_stats(stats_before, stats_snapshot(user_ids=add_users | remove_users))
+    db.session.commit()
+    get_principal_cache().invalidate(*add_users, *remove_users)
+
@@ -0,0 +1,155 @@
+"""Timing of requests: SQL queries (from SQLAlchemy engine events), template rendering (from Flask signals)
+and whole request. Each response gets "Server-Timing" header, seen in browser developer tools,
+and latency of every route is kept in histograms, exported in Prometheus text format.
+
+Metrics are kept by each app process, so with many gunicorn workers every scrape shows one of them."""
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import current_app, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# request latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    """What happened during one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql_time = 0.0
+        self.statements = Counter()
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.template_start = 0.0
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.repeated_statements = 0
+
+
+class Instrumentation:
+    """Statement executed at least "repeated_threshold" times in one request is logged as probable N+1 query,
+    e.g. relationship loaded separately for every row. Header can be turned off with "server_timing"."""
+
+    def __init__(self, app, engine, server_timing=True, repeated_threshold=5):
+        self.app = app
+        self.server_timing = server_timing
+        self.repeated_threshold = repeated_threshold
+        self._routes = defaultdict(RouteMetrics)
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        before_render_template.connect(self._before_render_template, app)
+        template_rendered.connect(self._template_rendered, app)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _stats(self):
+        if not has_request_context() or current_app._get_current_object() is not self.app:
+            return None
+        return g.get("_request_stats")
+
+    def _before_request(self):
+        g._request_stats = RequestStats()
+
+    def _before_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        stats = self._stats()
+        if stats is not None:
+            context._query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, connection, cursor, statement, parameters, context, executemany):
+        stats = self._stats()
+        if stats is not None and hasattr(context, "_query_start"):
+            stats.queries += 1
+            stats.sql_time += time.perf_counter() - context._query_start
+            stats.statements[statement] += 1
+
+    def _before_render_template(self, app, template, context, **extra):
+        stats = self._stats()
+        if stats is not None:
+            # templates rendered inside other template are timed as part of it
+            if stats.template_depth == 0:
+                stats.template_start = time.perf_counter()
+            stats.template_depth += 1
+
+    def _template_rendered(self, app, template, context, **extra):
+        stats = self._stats()
+        if stats is not None and stats.template_depth > 0:
+            stats.template_depth -= 1
+            if stats.template_depth == 0:
+                stats.template_time += time.perf_counter() - stats.template_start
+
+    def _after_request(self, response):
+        stats = self._stats()
+        if stats is None:
+            return response
+        route = (request.url_rule.rule if request.url_rule is not None else "unmatched", request.method)
+        if self.server_timing:
+            # streamed pages are rendered after headers are sent, their rendering is only in metrics
+            response.headers["Server-Timing"] = ", ".join([
+                f'sql;dur={stats.sql_time * 1000:.1f};desc="{stats.queries} queries"',
+                f"tpl;dur={stats.template_time * 1000:.1f}",
+                f"app;dur={(time.perf_counter() - stats.start) * 1000:.1f}",
+            ])
+        # request is finished (and counted) when whole response is sent
+        response.call_on_close(lambda: self._observe(route, stats))
+        return response
+
+    def _observe(self, route, stats):
+        latency = time.perf_counter() - stats.start
+        repeated = {statement: count for statement, count in stats.statements.items()
+                    if count >= self.repeated_threshold}
+        for statement, count in repeated.items():
+            logger.warning("%s %s: statement executed %d times, probable N+1 query: %s",
+                           route[1], route[0], count, " ".join(statement.split())[:200])
+        with self._lock:
+            metrics = self._routes[route]
+            for index, bucket in enumerate(BUCKETS):
+                if latency <= bucket:
+                    metrics.buckets[index] += 1
+            metrics.count += 1
+            metrics.total += latency
+            metrics.queries += stats.queries
+            metrics.sql_time += stats.sql_time
+            metrics.template_time += stats.template_time
+            metrics.repeated_statements += len(repeated)
+
+    def render_metrics(self):
+        """All metrics in Prometheus text format."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = ["# HELP http_request_duration_seconds Time of request, until response is sent.",
+                     "# TYPE http_request_duration_seconds histogram"]
+            for (rule, method), metrics in routes:
+                labels = f'route="{rule}",method="{method}"'
+                for bucket, count in zip(BUCKETS, metrics.buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bucket}"}} {count}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {metrics.total:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {metrics.count}")
+            counters = [
+                ("sql_queries_total", "SQL statements executed by requests.", "queries"),
+                ("sql_duration_seconds_total", "Time of SQL statements executed by requests.", "sql_time"),
+                ("template_duration_seconds_total", "Time of rendering templates.", "template_time"),
+                ("repeated_statements_total", "Statements executed many times in one request (probable N+1).",
+                 "repeated_statements"),
+            ]
+            for name, description, attribute in counters:
+                lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+                for (rule, method), metrics in routes:
+                    lines.append(f'{name}{{route="{rule}",method="{method}"}} {getattr(metrics, attribute)}')
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,79 @@
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MailQueueFull(Exception):
+    """Raised when there are already too many messages waiting to be sent."""
+
+
+class MailDispatcher:
+    """Sends Flask-Mail messages from background thread, so request doesn't wait for SMTP server.
+    Messages waiting in queue are sent in batches, over one SMTP connection per batch. If sending fails,
+    batch is retried after growing delay and dropped (with log) after "retries" attempts.
+
+    To try it locally, run SMTP server printing messages, e.g. "python -m aiosmtpd -n -l localhost:8025",
+    and set MAIL_SERVER=localhost, MAIL_PORT=8025, MAIL_USE_TLS=0."""
+
+    def __init__(self, app, mail, queue_size=100, batch_size=20, retries=3, backoff=1.0):
+        self.app = app
+        self.mail = mail
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._worker_pid = None
+
+    def send(self, message):
+        """Puts message in queue and returns right away."""
+        self._start_worker()
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            raise MailQueueFull()
+
+    def join(self):
+        """Waits until every message in queue is sent (or dropped)."""
+        self._queue.join()
+
+    def _start_worker(self):
+        # thread is started lazily and again after fork, so every app worker process has its own
+        with self._lock:
+            if self._worker_pid != os.getpid():
+                threading.Thread(target=self._run, name="mail-dispatcher", daemon=True).start()
+                self._worker_pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._send_batch(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _send_batch(self, batch):
+        not_sent = list(batch)
+        for attempt in range(self.retries + 1):
+            try:
+                with self.app.app_context(), self.mail.connect() as connection:
+                    while not_sent:
+                        connection.send(not_sent[0])
+                        not_sent.pop(0)
+                return
+            except (smtplib.SMTPException, OSError):
+                logger.exception("Sending emails failed, attempt %s of %s.", attempt + 1, self.retries + 1)
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+        logger.error("Dropped %s emails which couldn't be sent.", len(not_sent))
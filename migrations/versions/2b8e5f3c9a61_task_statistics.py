@@ -0,0 +1,63 @@
+"""task statistics
+
+Number of tasks for each deadline, done or not, in every project and of every user,
+counted from existing tasks.
+
+Revision ID: 2b8e5f3c9a61
+Revises: 7d2a9c4e1f05
+Create Date: 2026-10-18 20:41:12.502318
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8e5f3c9a61'
+down_revision = '7d2a9c4e1f05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    project_stats = op.create_table('project_stats',
+    sa.Column('project_id', sa.Integer(), nullable=False),
+    sa.Column('deadline', sa.Date(), nullable=False),
+    sa.Column('task_done', sa.Boolean(), nullable=False),
+    sa.Column('task_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['project_id'], ['projects.id'], name='project_stats_project_id_fkey', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('project_id', 'deadline', 'task_done')
+    )
+    user_stats = op.create_table('user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('deadline', sa.Date(), nullable=False),
+    sa.Column('task_done', sa.Boolean(), nullable=False),
+    sa.Column('task_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name='user_stats_user_id_fkey', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'deadline', 'task_done')
+    )
+
+    tasks = sa.table('tasks', sa.column('id', sa.Integer), sa.column('project_id', sa.Integer),
+                     sa.column('deadline', sa.Date), sa.column('task_done', sa.Boolean))
+    user_task = sa.table('user_task', sa.column('user_id', sa.Integer), sa.column('task_id', sa.Integer))
+    deadline = sa.func.coalesce(tasks.c.deadline, sa.literal(date.max, sa.Date))
+    task_done = sa.func.coalesce(tasks.c.task_done, sa.false())
+    op.execute(project_stats.insert().from_select(
+        ['project_id', 'deadline', 'task_done', 'task_count'],
+        sa.select(tasks.c.project_id, deadline, task_done, sa.func.count())
+        .where(tasks.c.project_id.isnot(None))
+        .group_by(tasks.c.project_id, deadline, task_done)
+    ))
+    op.execute(user_stats.insert().from_select(
+        ['user_id', 'deadline', 'task_done', 'task_count'],
+        sa.select(user_task.c.user_id, deadline, task_done, sa.func.count())
+        .select_from(user_task.join(tasks, tasks.c.id == user_task.c.task_id))
+        .group_by(user_task.c.user_id, deadline, task_done)
+    ))
+
+
+def downgrade():
+    op.drop_table('user_stats')
+    op.drop_table('project_stats')
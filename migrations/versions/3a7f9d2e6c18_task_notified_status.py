@@ -0,0 +1,43 @@
+"""task notified status
+
+Status of task when its users were last notified about deadline. Existing tasks get their current status,
+so users are notified only about tasks whose status changes after upgrade.
+
+Revision ID: 3a7f9d2e6c18
+Revises: 8f4c2d6b1e93
+Create Date: 2026-10-19 09:14:26.503817
+
+"""
+from datetime import date, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a7f9d2e6c18'
+down_revision = '8f4c2d6b1e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('notified_status', sa.String(length=20), nullable=True))
+
+    tasks = sa.table('tasks', sa.column('task_done', sa.Boolean), sa.column('deadline', sa.Date),
+                     sa.column('notified_status', sa.String))
+    # the same as "models.status_case", which can change later
+    today = date.today()
+    status = sa.case(
+        (tasks.c.task_done.is_(True), sa.literal('task_done')),
+        (tasks.c.deadline < today, sa.literal('deadline_passed')),
+        (tasks.c.deadline <= today + timedelta(days=3), sa.literal('deadline_warning')),
+        else_=sa.literal('in_progress'),
+    )
+    op.execute(tasks.update().values(notified_status=status))
+
+
+def downgrade():
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.drop_column('notified_status')
@@ -0,0 +1,52 @@
+"""cascade deletes
+
+Foreign keys get "ON DELETE" actions: tasks and assignments are deleted with their project, task or user,
+users are left without project when it's deleted. Rows left by deletes done before are cleaned up.
+
+Revision ID: 4c1e8f0a2b7d
+Revises: 9889351f1664
+Create Date: 2026-10-18 18:41:12.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1e8f0a2b7d'
+down_revision = '9889351f1664'
+branch_labels = None
+depends_on = None
+
+# same names as PostgreSQL gives to foreign keys by default, SQLite keeps them unnamed,
+# so batch mode needs convention to find them
+naming_convention = {"fk": "%(table_name)s_%(column_0_name)s_fkey"}
+# (table, column, referred table, "ON DELETE" action)
+foreign_keys = [
+    ("tasks", "project_id", "projects", "CASCADE"),
+    ("users", "project_id", "projects", "SET NULL"),
+    ("user_task", "user_id", "users", "CASCADE"),
+    ("user_task", "task_id", "tasks", "CASCADE"),
+]
+
+
+def recreate_foreign_keys(with_actions):
+    for table, column, referred_table, action in foreign_keys:
+        with op.batch_alter_table(table, schema=None, naming_convention=naming_convention) as batch_op:
+            batch_op.drop_constraint(f"{table}_{column}_fkey", type_="foreignkey")
+            batch_op.create_foreign_key(f"{table}_{column}_fkey", referred_table, [column], ["id"],
+                                        ondelete=action if with_actions else None)
+
+
+def upgrade():
+    # --- CLEAN UP ROWS LEFT BY DELETES
+    op.execute("DELETE FROM tasks WHERE project_id IS NOT NULL AND project_id NOT IN (SELECT id FROM projects)")
+    op.execute("UPDATE users SET project_id = NULL "
+               "WHERE project_id IS NOT NULL AND project_id NOT IN (SELECT id FROM projects)")
+    op.execute("DELETE FROM user_task WHERE user_id NOT IN (SELECT id FROM users) "
+               "OR task_id NOT IN (SELECT id FROM tasks)")
+    recreate_foreign_keys(with_actions=True)
+
+
+def downgrade():
+    recreate_foreign_keys(with_actions=False)
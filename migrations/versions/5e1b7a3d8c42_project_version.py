@@ -0,0 +1,28 @@
+"""project version
+
+Version of project is changed with its tasks, cached main page tasks of project are used only for the same version.
+
+Revision ID: 5e1b7a3d8c42
+Revises: 2b8e5f3c9a61
+Create Date: 2026-10-18 21:32:05.118264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1b7a3d8c42'
+down_revision = '2b8e5f3c9a61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,51 @@
+"""search index
+
+Full-text index of tasks (title, description) and users (name, email). SQLite keeps searched text in FTS5 tables,
+filled by triggers. PostgreSQL has GIN index of "tsvector" of the same columns.
+Statements are the same as "models.search_ddl". SQLite triggers are dropped when batch migration recreates their
+table, such migration has to create them again.
+
+Revision ID: 6b4d1f8e2a59
+Revises: 3a7f9d2e6c18
+Create Date: 2026-10-19 11:42:08.260397
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '6b4d1f8e2a59'
+down_revision = '3a7f9d2e6c18'
+branch_labels = None
+depends_on = None
+
+SEARCH_COLUMNS = {'tasks': ('title', 'description'), 'users': ('name', 'email')}
+
+
+def upgrade():
+    for table, columns in SEARCH_COLUMNS.items():
+        if op.get_bind().dialect.name == 'postgresql':
+            vector = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+            op.execute(f"CREATE INDEX ix_{table}_search ON {table} USING gin (to_tsvector('simple', {vector}))")
+            continue
+        fts = f'{table}_fts'
+        names = ', '.join(columns)
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+        insert = f'INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values});'
+        delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+        op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='id')")
+        op.execute(f'CREATE TRIGGER {fts}_insert AFTER INSERT ON {table} BEGIN {insert} END')
+        op.execute(f'CREATE TRIGGER {fts}_delete AFTER DELETE ON {table} BEGIN {delete} END')
+        op.execute(f'CREATE TRIGGER {fts}_update AFTER UPDATE OF {names} ON {table} BEGIN {delete} {insert} END')
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def downgrade():
+    for table in SEARCH_COLUMNS:
+        if op.get_bind().dialect.name == 'postgresql':
+            op.execute(f'DROP INDEX ix_{table}_search')
+        else:
+            for trigger in ('insert', 'delete', 'update'):
+                op.execute(f'DROP TRIGGER {table}_fts_{trigger}')
+            op.execute(f'DROP TABLE {table}_fts')
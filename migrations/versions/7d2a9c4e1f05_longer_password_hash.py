@@ -0,0 +1,32 @@
+"""longer password hash
+
+Hashes with longer salt (or other hashing method) don't fit in 100 characters.
+
+Revision ID: 7d2a9c4e1f05
+Revises: 4c1e8f0a2b7d
+Create Date: 2026-10-18 19:20:37.913540
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2a9c4e1f05'
+down_revision = '4c1e8f0a2b7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('password',
+               existing_type=sa.String(length=100),
+               type_=sa.String(length=255))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.alter_column('password',
+               existing_type=sa.String(length=255),
+               type_=sa.String(length=100))
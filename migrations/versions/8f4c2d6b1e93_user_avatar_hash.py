@@ -0,0 +1,40 @@
+"""user avatar hash
+
+Gravatar hash of email is stored with user, it's counted here for existing users.
+
+Revision ID: 8f4c2d6b1e93
+Revises: 5e1b7a3d8c42
+Create Date: 2026-10-18 22:10:47.630915
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f4c2d6b1e93'
+down_revision = '5e1b7a3d8c42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('avatar_hash', sa.String(length=32), nullable=True))
+
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('email', sa.String),
+                     sa.column('avatar_hash', sa.String))
+    connection = op.get_bind()
+    hashes = [{'user_id': user_id, 'avatar_hash': hashlib.md5(email.strip().lower().encode()).hexdigest()}
+              for user_id, email in connection.execute(sa.select(users.c.id, users.c.email)
+                                                       .where(users.c.email.isnot(None)))]
+    if hashes:
+        connection.execute(users.update().where(users.c.id == sa.bindparam('user_id'))
+                           .values(avatar_hash=sa.bindparam('avatar_hash')), hashes)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('avatar_hash')
@@ -0,0 +1,94 @@
+"""task deadline as date and indexes
+
+Task deadline becomes real date column, task status columns other than "task_done" are dropped (status is derived
+from deadline). Foreign keys used in filters get indexes and "user_task" gets primary key.
+
+Revision ID: 9889351f1664
+Revises: 10053ca84ab1
+Create Date: 2026-10-18 17:53:00.446455
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9889351f1664'
+down_revision = '10053ca84ab1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # --- BACKFILL
+    # empty deadline can't be converted to date
+    op.execute("UPDATE tasks SET deadline = NULL WHERE deadline = ''")
+    # assignments without user or task and duplicated assignments would break primary key
+    op.execute("DELETE FROM user_task WHERE user_id IS NULL OR task_id IS NULL")
+    op.execute("CREATE TABLE user_task_distinct AS SELECT DISTINCT user_id, task_id FROM user_task")
+    op.execute("DELETE FROM user_task")
+    op.execute("INSERT INTO user_task (user_id, task_id) SELECT user_id, task_id FROM user_task_distinct")
+    op.execute("DROP TABLE user_task_distinct")
+
+    # --- TASKS
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column('tasks', 'deadline',
+                        existing_type=sa.String(length=10),
+                        type_=sa.Date(),
+                        postgresql_using="deadline::date")
+    else:
+        # SQLite stores dates as "YYYY-MM-DD" text, which is exactly what the old column holds,
+        # but batch mode would CAST it to DATE (numeric affinity in SQLite) and keep only the year
+        op.add_column('tasks', sa.Column('deadline_date', sa.Date(), nullable=True))
+        op.execute("UPDATE tasks SET deadline_date = deadline")
+        with op.batch_alter_table('tasks', schema=None) as batch_op:
+            batch_op.drop_column('deadline')
+            batch_op.alter_column('deadline_date', new_column_name='deadline')
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.create_index('ix_tasks_project_id_deadline', ['project_id', 'deadline'], unique=False)
+        batch_op.drop_column('deadline_warning')
+        batch_op.drop_column('in_progress')
+        batch_op.drop_column('deadline_passed')
+
+    # --- USER TASK
+    with op.batch_alter_table('user_task', schema=None) as batch_op:
+        batch_op.alter_column('user_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+        batch_op.alter_column('task_id',
+               existing_type=sa.INTEGER(),
+               nullable=False)
+        batch_op.create_primary_key('user_task_pkey', ['user_id', 'task_id'])
+        batch_op.create_index(batch_op.f('ix_user_task_task_id'), ['task_id'], unique=False)
+
+    # --- USERS
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_position'), ['position'], unique=False)
+        batch_op.create_index(batch_op.f('ix_users_project_id'), ['project_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_project_id'))
+        batch_op.drop_index(batch_op.f('ix_users_position'))
+
+    with op.batch_alter_table('user_task', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_task_task_id'))
+        batch_op.drop_constraint('user_task_pkey', type_='primary')
+        batch_op.alter_column('task_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+        batch_op.alter_column('user_id',
+               existing_type=sa.INTEGER(),
+               nullable=True)
+
+    with op.batch_alter_table('tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deadline_passed', sa.BOOLEAN(), nullable=True))
+        batch_op.add_column(sa.Column('in_progress', sa.BOOLEAN(), nullable=True))
+        batch_op.add_column(sa.Column('deadline_warning', sa.BOOLEAN(), nullable=True))
+        batch_op.drop_index('ix_tasks_project_id_deadline')
+        batch_op.alter_column('deadline',
+                              existing_type=sa.Date(),
+                              type_=sa.String(length=10),
+                              postgresql_using="deadline::text")
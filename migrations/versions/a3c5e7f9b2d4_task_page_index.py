@@ -0,0 +1,25 @@
+"""task page index
+
+Main page reads tasks of each project page by page, ordered by ID.
+
+Revision ID: a3c5e7f9b2d4
+Revises: 6b4d1f8e2a59
+Create Date: 2026-10-20 10:05:41.118532
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e7f9b2d4'
+down_revision = '6b4d1f8e2a59'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_tasks_project_id_id', 'tasks', ['project_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_tasks_project_id_id', table_name='tasks')
@@ -0,0 +1,34 @@
+"""project created at
+
+Time project was created, it's part of key of cached main page tasks, because SQLite can give ID of deleted project
+to new one. Existing projects get time of upgrade.
+
+Revision ID: c4e6a8b0d2f3
+Revises: a3c5e7f9b2d4
+Create Date: 2026-10-20 11:32:17.904516
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e6a8b0d2f3'
+down_revision = 'a3c5e7f9b2d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    projects = sa.table('projects', sa.column('created_at', sa.DateTime))
+    op.execute(projects.update().values(created_at=datetime.utcnow()))
+
+
+def downgrade():
+    with op.batch_alter_table('projects', schema=None) as batch_op:
+        batch_op.drop_column('created_at')
@@ -0,0 +1,185 @@
+"""DB tables. They are created and updated with migrations: "flask db upgrade"."""
+import sqlite3
+from datetime import datetime, timedelta, date
+
+from flask_login import UserMixin
+from sqlalchemy import DDL, case, literal, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import relationship, validates
+
+from avatar import avatar_hash
+from extensions import db
+
+# set on how many days to deadline card should change color to warning
+DEADLINE_WARNING_DAYS = 3
+
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite checks foreign keys (and runs their "ON DELETE" actions) only if it's turned on for each connection."""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def status_dates(today=None):
+    """Returns current (or given) date and last date of deadline warning."""
+    current_date = today or date.today()
+    warning_date = current_date + timedelta(days=DEADLINE_WARNING_DAYS)
+    return current_date, warning_date
+
+
+def status_case(task_done, deadline, today=None):
+    """SQL expression of task status, the same as "Task.status", for given "task_done" and deadline columns."""
+    current_date, warning_date = status_dates(today)
+    return case(
+        (task_done.is_(True), literal("task_done")),
+        (deadline < current_date, literal("deadline_passed")),
+        (deadline <= warning_date, literal("deadline_warning")),
+        else_=literal("in_progress"),
+    )
+
+
+# --- PROJECTS DB
+# Association table for many-to-many relationship for users and tasks
+# One user can have multiple tasks, one task can have multiple users assigned
+# Assignment is deleted by DB together with its user or task
+user_task = db.Table("user_task",
+                     db.Column("user_id", db.Integer, db.ForeignKey('users.id', ondelete="CASCADE"), primary_key=True),
+                     db.Column("task_id", db.Integer, db.ForeignKey('tasks.id', ondelete="CASCADE"), primary_key=True,
+                               index=True)
+                     )
+
+
+class Project(db.Model):
+    __tablename__ = "projects"
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True)
+    # changed together with tasks of project, tells if cached main page tasks are still valid
+    version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    # SQLite can give ID of deleted project to new one, cached tasks are told apart also by time project was created
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # deleting project deletes its tasks and leaves its users without project, it's done by DB
+    tasks = relationship("Task", back_populates="project", passive_deletes=True)
+    users = relationship("User", back_populates="project", passive_deletes=True)
+
+
+# --- USERS DB
+class User(UserMixin, db.Model):
+    __tablename__ = "users"
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(100), unique=True)
+    # long enough for hashes made with other methods or longer salt
+    password = db.Column(db.String(255))
+    name = db.Column(db.String(100))
+    # position column to separate admins (managers) from users
+    position = db.Column(db.String(100), index=True)
+    project_id = db.Column(db.Integer, db.ForeignKey("projects.id", ondelete="SET NULL"), index=True)
+    project = relationship("Project", back_populates="users")
+    tasks = relationship("Task", secondary=user_task, backref="involved_users", passive_deletes=True)
+    # Gravatar hash of email, changed together with email
+    avatar_hash = db.Column(db.String(32))
+
+    @validates("email")
+    def update_avatar_hash(self, key, email):
+        self.avatar_hash = avatar_hash(email)
+        return email
+
+
+# --- TASKS DB
+class Task(db.Model):
+    __tablename__ = "tasks"
+    # project tasks are always searched by project and often by deadline, main page reads them by ID
+    __table_args__ = (db.Index("ix_tasks_project_id_deadline", "project_id", "deadline"),
+                      db.Index("ix_tasks_project_id_id", "project_id", "id"))
+    id = db.Column(db.Integer, primary_key=True)
+    title = db.Column(db.String(), unique=True)
+    description = db.Column(db.String(1000))
+    deadline = db.Column(db.Date)
+    project_id = db.Column(db.Integer, db.ForeignKey("projects.id", ondelete="CASCADE"))
+    project = relationship("Project", back_populates="tasks")
+    # only "done" is stored, every other status is derived from deadline on read
+    task_done = db.Column(db.Boolean)
+    # status of task when assigned users were last notified about deadlines, see "deadlines.py"
+    notified_status = db.Column(db.String(20))
+
+    @hybrid_property
+    def status(self):
+        """Task status regarding deadline: "task_done", "deadline_passed", "deadline_warning" or "in_progress"."""
+        current_date, warning_date = status_dates()
+        if self.task_done:
+            return "task_done"
+        elif self.deadline is None:
+            return "in_progress"
+        elif self.deadline < current_date:
+            return "deadline_passed"
+        elif self.deadline <= warning_date:
+            return "deadline_warning"
+        return "in_progress"
+
+    @status.expression
+    def status(cls):
+        return status_case(cls.task_done, cls.deadline)
+
+
+# --- STATISTICS DB
+# number of tasks for each deadline, done or not, in every project and of every user
+# kept up to date together with tasks, so statistics don't have to go through all the tasks
+# status of tasks is derived from deadline while reading, same as for single task
+class ProjectStats(db.Model):
+    __tablename__ = "project_stats"
+    project_id = db.Column(db.Integer, db.ForeignKey("projects.id", ondelete="CASCADE"), primary_key=True)
+    deadline = db.Column(db.Date, primary_key=True)
+    task_done = db.Column(db.Boolean, primary_key=True)
+    task_count = db.Column(db.Integer, nullable=False)
+
+
+class UserStats(db.Model):
+    __tablename__ = "user_stats"
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    deadline = db.Column(db.Date, primary_key=True)
+    task_done = db.Column(db.Boolean, primary_key=True)
+    task_count = db.Column(db.Integer, nullable=False)
+
+
+# --- FULL-TEXT SEARCH
+# searched columns of tables, see "helpers.search"
+SEARCH_COLUMNS = {"tasks": ("title", "description"), "users": ("name", "email")}
+
+
+def search_vector(table_name, qualified=True):
+    """PostgreSQL "tsvector" of searched columns, queries have to use the same expression as index."""
+    prefix = f"{table_name}." if qualified else ""
+    columns = " || ' ' || ".join(f"coalesce({prefix}{column}, '')" for column in SEARCH_COLUMNS[table_name])
+    return f"to_tsvector('simple', {columns})"
+
+
+def search_ddl(table_name, dialect):
+    """Statements creating full-text index of table: on SQLite FTS5 table with searched columns, kept up to date
+    by triggers, on PostgreSQL GIN index of "search_vector"."""
+    if dialect == "postgresql":
+        return [f"CREATE INDEX ix_{table_name}_search ON {table_name} USING gin ({search_vector(table_name, False)})"]
+    fts = f"{table_name}_fts"
+    columns = ", ".join(SEARCH_COLUMNS[table_name])
+    new_values = ", ".join(f"new.{column}" for column in SEARCH_COLUMNS[table_name])
+    old_values = ", ".join(f"old.{column}" for column in SEARCH_COLUMNS[table_name])
+    insert = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});"
+    delete = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({columns}, content='{table_name}', content_rowid='id')",
+        f"CREATE TRIGGER {fts}_insert AFTER INSERT ON {table_name} BEGIN {insert} END",
+        f"CREATE TRIGGER {fts}_delete AFTER DELETE ON {table_name} BEGIN {delete} END",
+        f"CREATE TRIGGER {fts}_update AFTER UPDATE OF {columns} ON {table_name} BEGIN {delete} {insert} END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+# tables made with "db.create_all" (e.g. in benchmarks) get their full-text index too
+for searched_table in (Task.__table__, User.__table__):
+    for dialect in ("sqlite", "postgresql"):
+        for statement in search_ddl(searched_table.name, dialect):
+            event.listen(searched_table, "after_create", DDL(statement).execute_if(dialect=dialect))
+    event.listen(searched_table, "before_drop",
+                 DDL(f"DROP TABLE IF EXISTS {searched_table.name}_fts").execute_if(dialect="sqlite"))
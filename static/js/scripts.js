@@ -23,5 +23,71 @@ window.addEventListener('DOMContentLoaded', event => {
         });
     }
 
-});
+    // Load next page of project tasks in place of "LOAD MORE" button
+    document.body.addEventListener('click', event => {
+        const loadMoreLink = event.target.closest('.load-more a');
+        if (!loadMoreLink) {
+            return;
+        }
+        event.preventDefault();
+        fetch(loadMoreLink.href, {credentials: 'same-origin'})
+            .then(response => response.text())
+            .then(html => {
+                loadMoreLink.closest('.load-more').outerHTML = html;
+            });
+    });
+
+    // Set task done or undone without reloading the page, only its card is replaced
+    document.body.addEventListener('submit', event => {
+        const toggleForm = event.target.closest('form[data-toggle-url]');
+        if (!toggleForm) {
+            return;
+        }
+        event.preventDefault();
+        const data = new FormData(toggleForm);
+        if (event.submitter && event.submitter.name) {
+            data.append(event.submitter.name, event.submitter.value);
+        }
+        fetch(toggleForm.dataset.toggleUrl, {method: 'POST', body: data, credentials: 'same-origin'})
+            .then(response => response.ok ? response.json() : Promise.reject(response))
+            .then(task => {
+                const card = toggleForm.closest('.task-card');
+                const hideDone = new URLSearchParams(window.location.search).get('hide_done');
+                if (task.status === 'task_done' && hideDone && hideDone !== '0') {
+                    card.remove();
+                } else {
+                    card.outerHTML = task.html;
+                }
+            })
+            // show current state of tasks if it didn't work
+            .catch(() => window.location.reload());
+    });
+
+    // Load again projects changed by someone else, changes are pushed from server as Server-Sent Events
+    const eventsElement = document.body.querySelector('[data-events-url]');
+    if (eventsElement && window.EventSource) {
+        const events = new EventSource(eventsElement.dataset.eventsUrl);
+        events.addEventListener('message', message => {
+            const change = JSON.parse(message.data);
+            const project = change.project_id === null ? null
+                : document.body.querySelector(`.project[data-project-id="${change.project_id}"]`);
+            if (change.type === 'changed' && project) {
+                if (change.name !== undefined) {
+                    project.querySelector('.project-name').textContent = change.name;
+                }
+                fetch(project.dataset.boardUrl, {credentials: 'same-origin'})
+                    .then(response => response.ok ? response.text() : Promise.reject(response))
+                    .then(html => {
+                        project.querySelector('.row').innerHTML = html;
+                    });
+            } else if (change.type === 'deleted' && project) {
+                project.remove();
+            } else if (change.type === 'user' || change.type === 'reload'
+                || (change.type === 'added' && eventsElement.dataset.lastPage)) {
+                // user's project or position changed, or there is new project to show
+                window.location.reload();
+            }
+        });
+    }
 
+});
@@ -0,0 +1,58 @@
+// Statistics page charts, filled with data from statistics endpoint
+Chart.defaults.global.defaultFontFamily = '-apple-system,system-ui,BlinkMacSystemFont,"Segoe UI",Roboto,"Helvetica Neue",Arial,sans-serif';
+Chart.defaults.global.defaultFontColor = '#292b2c';
+
+const statuses = [
+    {key: 'in_progress', label: 'In progress', color: '#007bff'},
+    {key: 'deadline_warning', label: 'Deadline warning', color: '#ffc107'},
+    {key: 'deadline_passed', label: 'Deadline passed', color: '#dc3545'},
+    {key: 'task_done', label: 'Done', color: '#28a745'},
+];
+
+window.addEventListener('DOMContentLoaded', event => {
+    fetch(statisticsUrl, {credentials: 'same-origin'})
+        .then(response => response.json())
+        .then(statistics => {
+            // Tasks of every project, stacked by status
+            new Chart(document.getElementById('projectsChart'), {
+                type: 'bar',
+                data: {
+                    labels: statistics.projects.map(project => project.name),
+                    datasets: statuses.map(status => ({
+                        label: status.label,
+                        backgroundColor: status.color,
+                        data: statistics.projects.map(project => project[status.key]),
+                    })),
+                },
+                options: {
+                    scales: {
+                        xAxes: [{stacked: true, gridLines: {display: false}}],
+                        yAxes: [{stacked: true, ticks: {min: 0, precision: 0}}],
+                    },
+                },
+            });
+
+            // All tasks by status
+            new Chart(document.getElementById('tasksChart'), {
+                type: 'pie',
+                data: {
+                    labels: statuses.map(status => status.label),
+                    datasets: [{
+                        data: statuses.map(status => statistics.projects
+                            .reduce((total, project) => total + project[status.key], 0)),
+                        backgroundColor: statuses.map(status => status.color),
+                    }],
+                },
+            });
+
+            // Tasks of every user
+            const usersTable = document.querySelector('#usersStatistics tbody');
+            statistics.users.forEach(user => {
+                const row = usersTable.insertRow();
+                row.insertCell().textContent = user.name;
+                statuses.forEach(status => {
+                    row.insertCell().textContent = user[status.key];
+                });
+            });
+        });
+});
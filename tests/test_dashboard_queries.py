@@ -0,0 +1,36 @@
+"""Main page has to read the same number of statements, no matter how many projects, tasks and users there are."""
+import pytest
+from sqlalchemy import event
+
+from benchmarks.routes import logged_in_client
+from benchmarks.seed import MANAGER_EMAIL, reset_database, seed
+from extensions import db
+from main import create_app
+
+SMALL = {"projects": 12, "tasks_per_project": 2, "users_per_project": 1, "tasks_per_user": 1, "free_users": 0}
+LARGE = {"projects": 40, "tasks_per_project": 60, "users_per_project": 8, "tasks_per_user": 6, "free_users": 20}
+
+
+def count_statements(tmp_path, size, url):
+    tmp_path.mkdir()
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'dashboard.db'}",
+                      "WTF_CSRF_ENABLED": False, "PASSWORD_HASH_WORKERS": 0})
+    statements = []
+    with app.app_context():
+        reset_database()
+        seed(**size)
+        client = logged_in_client(app, MANAGER_EMAIL)
+        event.listen(db.engine, "before_cursor_execute", lambda *arguments: statements.append(arguments[2]))
+        response = client.get(url)
+        # page is streamed, tasks are rendered while it's read
+        response.get_data()
+        response.close()
+    assert response.status_code == 200
+    return len(statements)
+
+
+@pytest.mark.parametrize("url", ["/", "/?hide_done=1"])
+def test_main_page_queries_dont_depend_on_data_size(tmp_path, url):
+    small = count_statements(tmp_path / "small", SMALL, url)
+    large = count_statements(tmp_path / "large", LARGE, url)
+    assert small == large
@@ -0,0 +1,317 @@
+"""Bulk import and export of projects, users and tasks, e.g. to bring in the whole team at once or to move data
+to other database. Files are read and written row by row, so memory used doesn't grow with their size.
+
+Every row has "type" ("project", "user" or "task") and fields of its type:
+  - project: name
+  - user: name, email, position, password, project (name, can be empty)
+  - task: title, description, deadline (YYYY-MM-DD, can be empty), project (name), done (1 or 0),
+    users (emails, separated by ";" in CSV)
+Files are JSON Lines (one JSON object on each line) or CSV with all fields as columns, unused ones left empty.
+Rows can refer only to projects and users which are already in DB or earlier in the file, export writes them
+in this order. Passwords aren't exported, they have to be filled in before users are imported again."""
+import csv
+import io
+import itertools
+import json
+from collections import Counter
+from datetime import date
+
+from avatar import avatar_hash
+from events import queue_event
+from extensions import db, get_principal_cache
+from helpers import bump_project_versions, insert_ignoring_duplicates, invalidate_choices, stats_snapshot, \
+    update_stats
+from models import Project, User, Task, user_task
+
+FIELDS = ("type", "name", "email", "position", "password", "project", "title", "description", "deadline", "done",
+          "users")
+FORMATS = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+# longest values of text columns
+MAX_LENGTHS = {"name": 100, "email": 100, "position": 100, "description": 1000}
+# rows inserted with one statement, passwords of users are hashed in parallel for each batch
+IMPORT_BATCH_SIZE = 500
+# rows read from DB at once and size of text sent at once while exporting
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+# only first errors are kept, rest is only counted
+MAX_REPORTED_ERRORS = 100
+
+
+def file_format(filename):
+    """Format by extension of file name, JSON Lines if it isn't CSV."""
+    return "csv" if filename and filename.lower().endswith(".csv") else "jsonl"
+
+
+class InvalidRow(ValueError):
+    """Raised with reason why imported row is skipped."""
+
+
+def text_field(row, name, required=False):
+    value = row.get(name)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise InvalidRow(f'"{name}" is required')
+    if len(value) > MAX_LENGTHS.get(name, len(value)):
+        raise InvalidRow(f'"{name}" is longer than {MAX_LENGTHS[name]} characters')
+    return value
+
+
+def list_field(row, name):
+    value = row.get(name) or []
+    if isinstance(value, str):
+        value = value.split(";")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def read_rows(stream, file_format):
+    """Rows of binary file as (line number, row), row is dict, or reason why line can't be read."""
+    lines = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if file_format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, "line is not valid JSON"
+            continue
+        yield number, row if isinstance(row, dict) else "line is not JSON object"
+
+
+class Importer:
+    """Validates rows and inserts them in batches, one type of rows at a time. Invalid rows are skipped and reported
+    by line number, the rest is inserted in current DB transaction."""
+
+    def __init__(self, password_hasher, batch_size=IMPORT_BATCH_SIZE):
+        self.password_hasher = password_hasher
+        self.batch_size = batch_size
+        self.imported = Counter()
+        self.errors = []
+        self.error_count = 0
+        self.assigned_users = set()
+        self.changed_projects = set()
+        self._batch_type = None
+        self._batch = []
+        # IDs of projects by name, there aren't many of them
+        self._project_ids = {}
+
+    def error(self, number, reason):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, reason))
+
+    def add(self, number, row):
+        if isinstance(row, str):
+            return self.error(number, row)
+        row_type = row.get("type")
+        if row_type not in ("project", "user", "task"):
+            return self.error(number, '"type" has to be "project", "user" or "task"')
+        if row_type != self._batch_type or len(self._batch) >= self.batch_size:
+            self.flush()
+            self._batch_type = row_type
+        self._batch.append((number, row))
+
+    def flush(self):
+        if self._batch:
+            getattr(self, f"_insert_{self._batch_type}s")(self._batch)
+            self._batch = []
+
+    def finish(self):
+        """Inserts the last batch and marks projects with new tasks as changed."""
+        self.flush()
+        # rows of the last batch are checked only now
+        self.errors.sort()
+        if self.changed_projects:
+            bump_project_versions(sorted(self.changed_projects))
+        for user_id in self.assigned_users:
+            queue_event("user", user_id=user_id)
+
+    def _valid_rows(self, batch, validate):
+        """Values of rows accepted by "validate", others are reported."""
+        valid = []
+        for number, row in batch:
+            try:
+                valid.append(validate(row))
+            except InvalidRow as error:
+                self.error(number, str(error))
+        return valid
+
+    def _existing(self, column, values):
+        values = {value for value in values if value}
+        return {value for value, in db.session.query(column).filter(column.in_(values))} if values else set()
+
+    def _load_projects(self, batch):
+        names = {text_field(row, "project") for _, row in batch} - self._project_ids.keys() - {""}
+        if names:
+            self._project_ids.update(db.session.query(Project.name, Project.id).filter(Project.name.in_(names)))
+
+    def _project_id(self, row, required):
+        name = text_field(row, "project", required)
+        if not name:
+            return None
+        if name not in self._project_ids:
+            raise InvalidRow(f'project "{name}" doesn\'t exist')
+        return self._project_ids[name]
+
+    def _insert_projects(self, batch):
+        taken = self._existing(Project.name, (str(row.get("name") or "").strip() for _, row in batch))
+
+        def validate(row):
+            name = text_field(row, "name", required=True)
+            if name in taken:
+                raise InvalidRow(f'project "{name}" already exists')
+            taken.add(name)
+            return {"name": name, "version": 0}
+
+        projects = self._valid_rows(batch, validate)
+        if not projects:
+            return
+        db.session.bulk_insert_mappings(Project, projects)
+        new_ids = db.session.query(Project.name, Project.id) \
+            .filter(Project.name.in_([project["name"] for project in projects]))
+        for name, project_id in new_ids:
+            self._project_ids[name] = project_id
+            queue_event("added", project_id=project_id)
+        self.imported["project"] += len(projects)
+
+    def _insert_users(self, batch):
+        taken = self._existing(User.email, (str(row.get("email") or "").strip() for _, row in batch))
+        self._load_projects(batch)
+
+        def validate(row):
+            email = text_field(row, "email", required=True)
+            if "@" not in email:
+                raise InvalidRow(f'"{email}" is not email address')
+            if email in taken:
+                raise InvalidRow(f'user with email "{email}" already exists')
+            user = {"name": text_field(row, "name", required=True), "email": email,
+                    "position": text_field(row, "position", required=True),
+                    "password": text_field(row, "password", required=True),
+                    "project_id": self._project_id(row, required=False),
+                    # set by "User" when email changes, but bulk insert doesn't go through it
+                    "avatar_hash": avatar_hash(email)}
+            taken.add(email)
+            return user
+
+        users = self._valid_rows(batch, validate)
+        if not users:
+            return
+        for user, pwhash in zip(users, self.password_hasher.hash_many(user["password"] for user in users)):
+            user["password"] = pwhash
+        db.session.bulk_insert_mappings(User, users)
+        self.imported["user"] += len(users)
+
+    def _insert_tasks(self, batch):
+        taken = self._existing(Task.title, (str(row.get("title") or "").strip() for _, row in batch))
+        self._load_projects(batch)
+        emails = {email for _, row in batch for email in list_field(row, "users")}
+        users = {email: (user_id, project_id) for user_id, email, project_id
+                 in db.session.query(User.id, User.email, User.project_id).filter(User.email.in_(emails))} \
+            if emails else {}
+
+        def validate(row):
+            title = text_field(row, "title", required=True)
+            if title in taken:
+                raise InvalidRow(f'task "{title}" already exists')
+            project_id = self._project_id(row, required=True)
+            deadline = text_field(row, "deadline")
+            try:
+                deadline = date.fromisoformat(deadline) if deadline else None
+            except ValueError:
+                raise InvalidRow('"deadline" has to be date in YYYY-MM-DD format') from None
+            user_ids = []
+            for email in list_field(row, "users"):
+                if email not in users:
+                    raise InvalidRow(f'user "{email}" doesn\'t exist')
+                if users[email][1] != project_id:
+                    raise InvalidRow(f'user "{email}" isn\'t in project of the task')
+                user_ids.append(users[email][0])
+            taken.add(title)
+            done = str(row.get("done") or "").strip().lower() in ("1", "true", "yes")
+            return {"title": title, "description": text_field(row, "description"), "deadline": deadline,
+                    "project_id": project_id, "task_done": done}, user_ids
+
+        tasks = self._valid_rows(batch, validate)
+        if not tasks:
+            return
+        db.session.bulk_insert_mappings(Task, [task for task, _ in tasks])
+        # assignments of the whole batch are inserted together, titles of tasks are unique
+        task_ids = dict(db.session.query(Task.title, Task.id).filter(Task.title.in_([task["title"]
+                                                                                    for task, _ in tasks])))
+        assignments = [{"user_id": user_id, "task_id": task_ids[task["title"]]}
+                       for task, user_ids in tasks for user_id in user_ids]
+        if assignments:
+            db.session.execute(insert_ignoring_duplicates(user_task), assignments)
+        update_stats({}, stats_snapshot(task_ids=list(task_ids.values())))
+        self.assigned_users.update(assignment["user_id"] for assignment in assignments)
+        self.changed_projects.update(task["project_id"] for task, _ in tasks)
+        self.imported["task"] += len(tasks)
+
+
+def import_rows(rows, password_hasher):
+    """Imports rows (from "read_rows") and commits them. Returns "Importer" with numbers of imported rows and errors.
+    File which can't be read further (e.g. not UTF-8) is imported up to that point."""
+    importer = Importer(password_hasher)
+    number = 0
+    try:
+        for number, row in rows:
+            importer.add(number, row)
+    except (csv.Error, UnicodeDecodeError) as error:
+        importer.error(number + 1, f"file can't be read further: {error}")
+    importer.finish()
+    db.session.commit()
+    invalidate_choices(("projects",), ("users",), *[("tasks", project_id) for project_id in importer.changed_projects])
+    # logged in users see their new tasks
+    get_principal_cache().invalidate(*importer.assigned_users)
+    return importer
+
+
+def export_rows():
+    """All projects, users (without passwords) and tasks with emails of their users, as rows for "import_rows".
+    Rows are read from DB in batches."""
+    for name, in db.session.query(Project.name).order_by(Project.id).yield_per(EXPORT_BATCH_SIZE):
+        yield {"type": "project", "name": name}
+    users = db.session.query(User.name, User.email, User.position, Project.name) \
+        .outerjoin(Project, Project.id == User.project_id) \
+        .order_by(User.id) \
+        .yield_per(EXPORT_BATCH_SIZE)
+    for name, email, position, project in users:
+        yield {"type": "user", "name": name, "email": email, "position": position, "project": project}
+    # task is read once for each of its users, and rows of one task come one after another
+    tasks = db.session.query(Task.id, Task.title, Task.description, Task.deadline, Task.task_done, Project.name,
+                             User.email) \
+        .outerjoin(Project, Project.id == Task.project_id) \
+        .outerjoin(user_task, user_task.c.task_id == Task.id) \
+        .outerjoin(User, User.id == user_task.c.user_id) \
+        .order_by(Task.id, User.id) \
+        .yield_per(EXPORT_BATCH_SIZE)
+    for _, task_rows in itertools.groupby(tasks, key=lambda task_row: task_row[0]):
+        task_rows = list(task_rows)
+        _, title, description, deadline, task_done, project, _ = task_rows[0]
+        yield {"type": "task", "title": title, "description": description,
+               "deadline": deadline.isoformat() if deadline else None, "project": project, "done": bool(task_done),
+               "users": [email for *_, email in task_rows if email is not None]}
+
+
+def format_rows(rows, file_format):
+    """Text of rows in JSON Lines or CSV, in chunks of about EXPORT_CHUNK_SIZE characters."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, FIELDS)
+    if file_format == "csv":
+        writer.writeheader()
+    for row in rows:
+        if file_format == "jsonl":
+            buffer.write(json.dumps(row) + "\n")
+        elif row["type"] == "task":
+            writer.writerow({**row, "done": int(row["done"]), "users": ";".join(row["users"])})
+        else:
+            writer.writerow(row)
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1 @@
+"""Views of the app, one blueprint for each part of it."""
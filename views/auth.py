@@ -0,0 +1,153 @@
+"""Logging in and out, passwords, and decorators limiting views to logged in users or managers."""
+import secrets
+from functools import wraps
+
+from flask import Blueprint, current_app, render_template, redirect, flash
+from flask_login import UserMixin, login_user, current_user, logout_user, login_required
+
+from extensions import db, login_manager, get_password_hasher, get_principal_cache, get_mail_dispatcher
+from forms import LoginUser, ChangePassword, PasswordRecovery
+from models import User, user_task
+
+bp = Blueprint("auth", __name__)
+
+
+class Principal(UserMixin):
+    """Logged in user as seen by decorators, views and templates: user data, position and IDs of user's tasks.
+    It's loaded once per request (or taken from cache) and not bound to DB session, so using it doesn't query DB."""
+
+    def __init__(self, id, name, email, avatar_hash, position, project_id, task_ids):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.avatar_hash = avatar_hash
+        self.position = position
+        self.project_id = project_id
+        self.task_ids = task_ids
+
+
+def load_principal(user_id):
+    """Loads user with IDs of its tasks in one query."""
+    rows = db.session.query(User.id, User.name, User.email, User.avatar_hash, User.position, User.project_id,
+                            user_task.c.task_id) \
+        .outerjoin(user_task, user_task.c.user_id == User.id) \
+        .filter(User.id == user_id) \
+        .all()
+    if not rows:
+        return None
+    user_id, name, email, user_avatar_hash, position, project_id, _ = rows[0]
+    task_ids = frozenset(row.task_id for row in rows if row.task_id is not None)
+    return Principal(user_id, name, email, user_avatar_hash, position, project_id, task_ids)
+
+
+# custom decorator that only allows admin (manager) to access certain views
+def admin_only(func):
+    @wraps(func)
+    def wrapped_view(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return redirect("/login")
+        if current_user.position != "manager":
+            return redirect("/401")
+        return func(*args, **kwargs)
+
+    return wrapped_view
+
+
+# custom decorator to require user to log in before entering main page
+# redirects to login page
+def users_only(func):
+    @wraps(func)
+    def wrapped_view(*args, **kwargs):
+        if not current_user.is_authenticated:
+            return redirect("/login")
+        return func(*args, **kwargs)
+
+    return wrapped_view
+
+
+@bp.route('/change-password', methods=["GET", "POST"])
+@login_required
+def change_password():
+    """Allows to change temporary password with new hashed and added to DB."""
+    form = ChangePassword()
+    if form.validate_on_submit():
+        user = User.query.get(current_user.get_id())
+        if get_password_hasher().check(user.password, form.old_password.data):
+            if form.new_password.data == form.new_password_repeat.data:
+                user.password = get_password_hasher().hash(form.new_password.data)
+                db.session.commit()
+                return redirect("/")
+            else:
+                flash("Passwords doesn't match.")
+        else:
+            flash("Wrong password.")
+    return render_template("change_password.html", form=form)
+
+
+@bp.route('/login', methods=["GET", "POST"])
+def login():
+    form = LoginUser()
+    if form.validate_on_submit():
+        user = User.query.filter_by(email=form.email.data).first()
+        if user and get_password_hasher().check(user.password, form.password.data):
+            # password is known only now, so it's the moment to hash it again if hashing parameters changed
+            if get_password_hasher().needs_rehash(user.password):
+                user.password = get_password_hasher().hash(form.password.data)
+                db.session.commit()
+            login_user(user)
+            return redirect("/")
+        else:
+            flash("Email or password incorrect!")
+    return render_template("login.html", form=form)
+
+
+@bp.route("/password-recovery", methods=["GET", "POST"])
+def password_recovery():
+    """Password recovery function sending temporary password to user's mail, only if user is firstly registered in DB"""
+    form = PasswordRecovery()
+    # generate random password
+    temporary_password = secrets.token_urlsafe(16)
+    if form.validate_on_submit():
+        if not current_app.config["MAIL_ENABLED"]:
+            flash("Password recovery is not working due to Heroku restrictions.")
+            return redirect("/login")
+        user = User.query.filter_by(email=form.email.data).first()
+        if user is None:
+            flash("Wrong email.")
+            return redirect("/login")
+        # mail is rarely used, so it's imported only when needed
+        from flask_mail import Message
+        from mail_queue import MailQueueFull
+        user.password = get_password_hasher().hash(temporary_password)
+        msg = Message("'Project Manager App' password reset", recipients=[form.email.data])
+        msg.body = f"Your temporary password to 'Project Manger App' is {temporary_password}"
+        # email is only put in queue, it's sent in background
+        try:
+            get_mail_dispatcher().send(msg)
+        except MailQueueFull:
+            db.session.rollback()
+            flash("Too many emails are being sent, try again in a moment.")
+            return redirect("/login")
+        db.session.commit()
+        flash("Email with temporary password has been sent.")
+        return redirect("/login")
+    return render_template("password_recovery.html", form=form)
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    user_id = int(user_id)
+    principal_cache = get_principal_cache()
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        principal = load_principal(user_id)
+        if principal is not None:
+            principal_cache.set(user_id, principal)
+    return principal
+
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    return redirect("/")
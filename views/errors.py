@@ -0,0 +1,27 @@
+"""Error pages."""
+from flask import Blueprint, render_template
+
+from hashing import HashingBusy
+
+bp = Blueprint("errors", __name__)
+
+
+@bp.route("/401")
+def error_401():
+    return render_template("errors.html", error_type="401")
+
+
+@bp.route("/404")
+def error_404():
+    return render_template("errors.html", error_type="404")
+
+
+@bp.route("/500")
+def error_500():
+    return render_template("errors.html", error_type="500")
+
+
+@bp.app_errorhandler(HashingBusy)
+def error_503(error):
+    """Too many passwords are being hashed at once (e.g. many users logging in), user can try again in a moment."""
+    return render_template("errors.html", error_type="503"), 503
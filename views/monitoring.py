@@ -0,0 +1,14 @@
+"""Metrics of the app, see "instrumentation.py"."""
+from flask import Blueprint, current_app, Response
+
+from views.auth import admin_only
+
+bp = Blueprint("monitoring", __name__)
+
+
+@bp.route("/metrics")
+@admin_only
+def metrics():
+    """Metrics of this app process, in Prometheus text format."""
+    instrumentation = current_app.extensions["instrumentation"]
+    return Response(instrumentation.render_metrics(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,78 @@
+"""Adding, editing and deleting projects."""
+from flask import Blueprint, render_template, redirect
+from sqlalchemy import select
+
+from events import queue_event
+from extensions import db, get_principal_cache
+from forms import AddProject, DeleteList
+from helpers import select_project, choices, invalidate_choices, users_selection, stats_snapshot, update_stats, \
+    change_users
+from models import Project, Task
+from views.auth import admin_only
+
+bp = Blueprint("projects", __name__)
+
+
+@bp.route("/add-project", methods=["GET", "POST"])
+@admin_only
+def add_project():
+    form = AddProject()
+    form = users_selection(form=form, selection_type="add_project", project_id=None)
+    if form.validate_on_submit():
+        # add new project to DB
+        new_project = Project()
+        new_project.name = form.name.data
+        db.session.add(new_project)
+        # flush to get new project ID and bind users with it, everything is committed together
+        db.session.flush()
+        queue_event("added", project_id=new_project.id)
+        change_users(add_users=form.free_users.data, project=new_project)
+        invalidate_choices(("projects",))
+        return redirect("/")
+    return render_template("add_project.html", form=form, form_type="add")
+
+
+@bp.route("/edit-project", methods=["GET", "POST"])
+@admin_only
+def select_project_to_edit():
+    """Middle function used to choose which project will be edited. Redirects to proper edit form."""
+    return select_project("projects.edit_project")
+
+
+@bp.route("/edit-project/<int:project_id>", methods=["GET", "POST"])
+@admin_only
+def edit_project(project_id):
+    project_to_edit = Project.query.get(project_id)
+    form = AddProject(
+        name=project_to_edit.name
+    )
+    form = users_selection(form=form, selection_type="edit_project", project_id=project_id)
+    if form.validate_on_submit():
+        if project_to_edit.name != form.name.data:
+            project_to_edit.name = form.name.data
+            queue_event("changed", project_id=project_id, name=project_to_edit.name)
+        change_users(add_users=form.free_users.data, remove_users=form.occupied_users.data, project=project_to_edit)
+        invalidate_choices(("projects",))
+        return redirect("/")
+    return render_template("edit_project.html", form=form)
+
+
+@bp.route("/delete-project", methods=["GET", "POST"])
+@admin_only
+def delete_project():
+    """Lists all projects. Multiple projects can be deleted at once."""
+    form = DeleteList()
+    form.list.choices = choices("projects")
+    if form.validate_on_submit():
+        # tasks with their assignments are deleted and users are left without project by DB
+        project_ids = [int(project_id) for project_id in form.list.data]
+        update_stats(stats_snapshot(task_ids=select(Task.id).where(Task.project_id.in_(project_ids))), {})
+        Project.query.filter(Project.id.in_(project_ids)).delete(synchronize_session=False)
+        for project_id in project_ids:
+            queue_event("deleted", project_id=project_id)
+        db.session.commit()
+        invalidate_choices(("projects",), *[("tasks", project_id) for project_id in project_ids])
+        # users of deleted projects changed, deleting projects is rare enough to drop all of them
+        get_principal_cache().clear()
+        return redirect("/")
+    return render_template("delete_form.html", form=form, selection_goal="project")
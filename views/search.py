@@ -0,0 +1,32 @@
+"""Full-text search of tasks and users, see "helpers.search"."""
+from flask import Blueprint, render_template, request
+from flask_login import current_user
+
+from extensions import db
+from helpers import search, search_page, search_words
+from models import Project, User, Task
+from views.auth import users_only
+
+bp = Blueprint("search", __name__)
+
+
+@bp.route("/search")
+@users_only
+def search_results():
+    """Tasks and users found by words of "q", manager finds all of them, user only ones of own project
+    (so user without project finds nothing)."""
+    text = request.args.get("q", "")
+    page = max(request.args.get("page", 1, type=int), 1)
+    words = search_words(text)
+    tasks, users, more_results = [], [], False
+    # "project_id == None" would be "IS NULL", matching all users without project
+    if words and (current_user.position == "manager" or current_user.project_id is not None):
+        tasks_query = db.session.query(Task, Project.name).outerjoin(Project, Project.id == Task.project_id)
+        users_query = User.query
+        if current_user.position != "manager":
+            tasks_query = tasks_query.filter(Task.project_id == current_user.project_id)
+            users_query = users_query.filter(User.project_id == current_user.project_id)
+        tasks, more_tasks = search_page(search(tasks_query, Task, words), page)
+        users, more_users = search_page(search(users_query, User, words), page)
+        more_results = more_tasks or more_users
+    return render_template("search.html", text=text, page=page, tasks=tasks, users=users, more_results=more_results)
@@ -0,0 +1,44 @@
+"""Statistics of tasks in projects and of users."""
+from flask import Blueprint, render_template, jsonify
+from sqlalchemy import func
+
+from extensions import db
+from helpers import rebuild_stats
+from models import Project, User, ProjectStats, UserStats, status_case
+from views.auth import admin_only
+
+# CLI commands are added without group: "flask rebuild-stats"
+bp = Blueprint("statistics", __name__, cli_group=None)
+
+
+@bp.route("/statistics")
+@admin_only
+def charts():
+    return render_template("charts.html")
+
+
+@bp.route("/statistics/data")
+@admin_only
+def statistics_data():
+    """Number of tasks in each status for every project and user, read from statistics tables."""
+    statuses = ["in_progress", "deadline_warning", "deadline_passed", "task_done"]
+
+    def count_statuses(stats, id_column, names):
+        status = status_case(stats.task_done, stats.deadline)
+        counts = {row_id: dict.fromkeys(statuses, 0) for row_id in names}
+        for row_id, row_status, task_count in db.session.query(id_column, status, func.sum(stats.task_count)) \
+                .group_by(id_column, status):
+            counts.setdefault(row_id, dict.fromkeys(statuses, 0))[row_status] = task_count
+        return [{"id": row_id, "name": names.get(row_id), **row_counts} for row_id, row_counts in counts.items()]
+
+    project_names = dict(db.session.query(Project.id, Project.name).order_by(Project.id))
+    user_names = dict(db.session.query(User.id, User.name).filter(User.position != "manager").order_by(User.id))
+    return jsonify(projects=count_statuses(ProjectStats, ProjectStats.project_id, project_names),
+                   users=count_statuses(UserStats, UserStats.user_id, user_names))
+
+
+@bp.cli.command("rebuild-stats")
+def rebuild_stats_command():
+    """Counts statistics again from all tasks, e.g. after changing tasks directly in DB."""
+    rebuild_stats()
+    db.session.commit()
@@ -0,0 +1,228 @@
+"""Main page with tasks of projects, and adding, editing and deleting tasks."""
+import click
+from flask import Blueprint, current_app, render_template, redirect, url_for, request, jsonify, abort, Response
+from flask_login import current_user
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from deadlines import notify_deadlines
+from events import event_stream
+from extensions import db, get_principal_cache, get_event_broker
+from forms import TaskDone, DeleteList, AddTask, UserSelectionField
+from helpers import PROJECTS_PER_PAGE, stream_template, dashboard_tasks, project_boards, select_project, choices, \
+    invalidate_choices, users_selection, stats_snapshot, update_stats, bump_project_versions, change_users, \
+    may_set_done, set_task_done
+from models import Project, Task
+from views.auth import admin_only, users_only
+
+# CLI commands are added without group: "flask notify-deadlines"
+bp = Blueprint("tasks", __name__, cli_group=None)
+
+
+@bp.route("/", methods=["GET", "POST"])
+@users_only
+def index():
+    # check if any task was changed to "DONE"
+    task_done_form = TaskDone()
+    if task_done_form.validate_on_submit():
+        # task can be set done by user, but undone only by manager
+        # form works both ways, for user UNDONE button is not shown
+        task = Task.query.options(selectinload(Task.involved_users)).get(task_done_form.id.data)
+        if task is not None and may_set_done(task, not task.task_done):
+            set_task_done(task, not task.task_done)
+            db.session.commit()
+    # task status is derived from deadline while rendering, so showing the page doesn't write anything to DB
+    # determine which projects and tasks can be shown
+    # for manager show all the projects with all the tasks, page by page
+    # for users show only tasks on project they are assigned for
+    hide_done = request.args.get("hide_done", type=int)
+    projects_query = Project.query.order_by(Project.id)
+    if current_user.position == "manager":
+        after = request.args.get("after", type=int)
+        if after is not None:
+            projects_query = projects_query.filter(Project.id > after)
+        all_projects = projects_query.limit(PROJECTS_PER_PAGE + 1).all()
+    else:
+        all_projects = projects_query.filter_by(id=current_user.project_id).all()
+    more_projects = len(all_projects) > PROJECTS_PER_PAGE
+    all_projects = all_projects[:PROJECTS_PER_PAGE]
+    boards = project_boards(all_projects, hide_done=hide_done, form=task_done_form)
+    # page is sent while it's rendered, so first projects are shown before the rest is ready
+    return stream_template("index.html", projects=all_projects, boards=boards, more_projects=more_projects,
+                           hide_done=hide_done, form=task_done_form)
+
+
+@bp.route("/project/<int:project_id>/tasks")
+@users_only
+def project_tasks(project_id):
+    """Next page of project tasks, loaded with "LOAD MORE" button on main page."""
+    if current_user.position != "manager" and current_user.project_id != project_id:
+        return redirect("/401")
+    hide_done = request.args.get("hide_done", type=int)
+    board = dashboard_tasks([project_id], hide_done=hide_done, after=request.args.get("after", type=int))
+    tasks, more_tasks = board[project_id]
+    return render_template("project_tasks.html", project_id=project_id, tasks=tasks, more_tasks=more_tasks,
+                           hide_done=hide_done, form=TaskDone())
+
+
+@bp.route("/project/<int:project_id>/board")
+@users_only
+def project_board(project_id):
+    """First page of project tasks, loaded again by main page when project is changed by someone else."""
+    if current_user.position != "manager" and current_user.project_id != project_id:
+        return redirect("/401")
+    project = Project.query.get(project_id)
+    if project is None:
+        abort(404)
+    hide_done = request.args.get("hide_done", type=int)
+    _, board = next(project_boards([project], hide_done=hide_done, form=TaskDone()))
+    return board
+
+
+@bp.route("/events")
+@users_only
+def event_feed():
+    """Changes of projects and of current user as Server-Sent Events, see "events.py"."""
+    if not current_app.config["EVENTS_ENABLED"]:
+        abort(404)
+    # user is read before streaming, stream itself doesn't use DB
+    stream = event_stream(get_event_broker(), manager=current_user.position == "manager",
+                          project_id=current_user.project_id, user_id=current_user.id,
+                          duration=current_app.config["EVENTS_STREAM_SECONDS"])
+    response = Response(stream, mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # proxies (e.g. nginx) shouldn't wait for the whole response
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@bp.route("/task/<int:task_id>/done", methods=["POST"])
+@users_only
+def toggle_task(task_id):
+    """Sets task done ("done" button) or undone ("undone" button), used by script on main page instead of sending
+    the whole form. Returns new status and card of the task, which replaces the old one."""
+    form = TaskDone()
+    if not form.validate_on_submit():
+        return jsonify(error="Form is not valid, reload the page."), 400
+    task = Task.query.options(selectinload(Task.involved_users)).get(task_id)
+    if task is None:
+        abort(404)
+    done = not form.undone.data if form.done.data or form.undone.data else not task.task_done
+    if not may_set_done(task, done):
+        return jsonify(error="You can't change this task."), 403
+    if bool(task.task_done) != done:
+        set_task_done(task, done)
+    # card is rendered before commit, which would expire loaded task
+    card = render_template("task_card.html", task=task, form=form)
+    status = task.status
+    db.session.commit()
+    return jsonify(id=task_id, status=status, html=card)
+
+
+@bp.route("/add-task", methods=["GET", "POST"])
+@admin_only
+def select_project_to_add_task():
+    """Middle function used to choose to which project task will be added. Redirects to proper add form."""
+    return select_project("tasks.add_task")
+
+
+@bp.route("/add-task/<int:project_id>", methods=["GET", "POST"])
+@admin_only
+def add_task(project_id):
+    form = AddTask()
+    form = users_selection(form=form, selection_type="add_task", project_id=project_id)
+    # if form is filled correctly add data to DB
+    if form.validate_on_submit():
+        new_task_creation = Task()
+        new_task_creation.title = form.title.data
+        new_task_creation.description = form.description.data
+        new_task_creation.deadline = form.deadline.data
+        new_task_creation.project_id = project_id
+        # by default state that new task is not done, rest of the status comes from deadline
+        new_task_creation.task_done = False
+        db.session.add(new_task_creation)
+        # flush to get new task ID and assign users to it, everything is committed together
+        db.session.flush()
+        update_stats({}, stats_snapshot(task_ids=[new_task_creation.id]))
+        change_users(add_users=form.occupied_users.data + form.free_users.data, task=new_task_creation)
+        invalidate_choices(("tasks", project_id))
+        return redirect("/")
+    return render_template("add_task.html", form=form, form_type="add")
+
+
+@bp.route("/edit-task/", methods=["GET", "POST"])
+@admin_only
+def select_project_to_edit_task():
+    """Middle function used to choose from which project task will be edited. Redirects to another select form."""
+    return select_project("tasks.choose_task_to_edit")
+
+
+@bp.route("/edit-task/<int:project_id>", methods=["GET", "POST"])
+@admin_only
+def choose_task_to_edit(project_id):
+    """Middle function used to choose which specific task will be edited. Redirects to proper edit form."""
+    form = UserSelectionField()
+    form.selection_id.choices = [("", "")] + choices("tasks", project_id)
+    if form.validate_on_submit():
+        return redirect(url_for("tasks.edit_task", project_id=project_id, task_id=form.selection_id.data))
+    return render_template("selection_form.html", form=form, selection_goal="task")
+
+
+@bp.route("/edit-task/<int:project_id>/<int:task_id>", methods=["GET", "POST"])
+@admin_only
+def edit_task(project_id, task_id):
+    task_to_edit = Task.query.get(task_id)
+    form = AddTask(
+        title=task_to_edit.title,
+        description=task_to_edit.description,
+        deadline=task_to_edit.deadline,
+    )
+    form = users_selection(form=form, selection_type="edit_task", project_id=project_id, task_id=task_id)
+    if form.validate_on_submit():
+        updated_task = Task.query.get(task_id)
+        stats_before = stats_snapshot(task_ids=[task_id])
+        updated_task.title = form.title.data
+        updated_task.description = form.description.data
+        updated_task.deadline = form.deadline.data
+        db.session.flush()
+        update_stats(stats_before, stats_snapshot(task_ids=[task_id]))
+        # check if any currently assigned user is to be removed from task
+        change_users(add_users=form.free_users.data, remove_users=form.occupied_users.data, task=updated_task)
+        invalidate_choices(("tasks", project_id))
+        return redirect("/")
+    return render_template("edit_tasks.html", project_id=project_id, task_id=task_id, form=form)
+
+
+@bp.route("/delete-tasks", methods=["GET", "POST"])
+@admin_only
+def select_project_to_delete_tasks():
+    return select_project("tasks.choose_tasks_to_delete")
+
+
+@bp.route("/delete-tasks/<int:project_id>", methods=["GET", "POST"])
+@admin_only
+def choose_tasks_to_delete(project_id):
+    """Middle function used to choose from which project task will be deleted. Redirects to proper delete form."""
+    form = DeleteList()
+    form.list.choices = choices("tasks", project_id)
+    if form.validate_on_submit():
+        # assignments of tasks are deleted by DB
+        task_ids = select(Task.id).where(Task.id.in_([int(task_id) for task_id in form.list.data]),
+                                         Task.project_id == project_id)
+        update_stats(stats_snapshot(task_ids=task_ids), {})
+        Task.query.filter(Task.id.in_(task_ids)).delete(synchronize_session=False)
+        bump_project_versions([project_id])
+        db.session.commit()
+        invalidate_choices(("tasks", project_id))
+        # tasks of some users changed, deleting tasks is rare enough to drop all of them
+        get_principal_cache().clear()
+        return redirect("/")
+    return render_template("delete_form.html", form=form, selection_goal="task")
+
+
+@bp.cli.command("notify-deadlines")
+@click.option("--date", "today", type=click.DateTime(["%Y-%m-%d"]), help="run as if it was given date")
+def notify_deadlines_command(today):
+    """Emails users about their tasks which got close to deadline or went past it since last run, run it daily."""
+    users, sent = notify_deadlines(today.date() if today else None)
+    click.echo(f"{users} users to notify, {sent} emails sent")
@@ -0,0 +1,68 @@
+"""Import and export of projects, users and tasks, see "transfer.py"."""
+import os
+
+import click
+from flask import Blueprint, current_app, render_template, abort, Response, stream_with_context, flash
+
+from extensions import db, get_password_hasher
+from forms import ImportData
+from hashing import HashingBusy, PasswordHasher
+from transfer import FORMATS, file_format, read_rows, import_rows, export_rows, format_rows
+from views.auth import admin_only
+
+# CLI commands are added without group: "flask import-data"
+bp = Blueprint("transfer", __name__, cli_group=None)
+
+
+@bp.route("/import", methods=["GET", "POST"])
+@admin_only
+def import_data():
+    """Upload is read row by row from temporary file, which Flask keeps on disk when it's big."""
+    form = ImportData()
+    importer = None
+    if form.validate_on_submit():
+        upload = form.file.data
+        try:
+            importer = import_rows(read_rows(upload.stream, file_format(upload.filename)), get_password_hasher())
+        except HashingBusy:
+            db.session.rollback()
+            flash("Too many passwords are being hashed, try again in a moment.")
+    return render_template("import_data.html", form=form, importer=importer)
+
+
+@bp.route("/export.<file_format>")
+@admin_only
+def export_data(file_format):
+    """All projects, users and tasks, sent while they're read from DB."""
+    if file_format not in FORMATS:
+        abort(404)
+    response = Response(stream_with_context(format_rows(export_rows(), file_format)), mimetype=FORMATS[file_format])
+    response.headers["Content-Disposition"] = f"attachment; filename=project_manager.{file_format}"
+    return response
+
+
+@bp.cli.command("import-data")
+@click.argument("file", type=click.File("rb"))
+@click.option("--format", "chosen_format", type=click.Choice(list(FORMATS)), help="by default from file extension")
+def import_data_command(file, chosen_format):
+    """Imports projects, users and tasks from JSON Lines or CSV file, hashing passwords on all CPU cores."""
+    password_hasher = PasswordHasher(method=current_app.config["PASSWORD_HASH_METHOD"],
+                                     salt_length=current_app.config["PASSWORD_SALT_LENGTH"],
+                                     workers=os.cpu_count() or 1, queue_size=0)
+    try:
+        importer = import_rows(read_rows(file, chosen_format or file_format(file.name)), password_hasher)
+    finally:
+        password_hasher.shutdown()
+    for number, reason in importer.errors:
+        click.echo(f"line {number}: {reason}", err=True)
+    imported = ", ".join(f"{importer.imported[row_type]} {row_type}s" for row_type in ("project", "user", "task"))
+    click.echo(f"{imported} imported, {importer.error_count} rows skipped")
+
+
+@bp.cli.command("export-data")
+@click.argument("file", type=click.File("w"), default="-")
+@click.option("--format", "chosen_format", type=click.Choice(list(FORMATS)), help="by default from file extension")
+def export_data_command(file, chosen_format):
+    """Writes all projects, users and tasks to JSON Lines or CSV file (or to standard output)."""
+    for chunk in format_rows(export_rows(), chosen_format or file_format(file.name)):
+        file.write(chunk)
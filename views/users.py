@@ -0,0 +1,114 @@
+"""List of users, adding, editing and deleting them, and their avatars."""
+import re
+
+from flask import Blueprint, current_app, render_template, redirect, abort, request, Response
+from flask_login import login_required
+from sqlalchemy import select
+
+from events import queue_event
+from extensions import db, get_password_hasher, get_principal_cache, get_avatar_cache
+from forms import AddUser, EditUser, DeleteList
+from helpers import USERS_PER_PAGE, USER_SORT_COLUMNS, bump_project_versions, choices, invalidate_choices, \
+    users_table
+from models import User, Task, user_task
+from views.auth import admin_only, users_only
+
+bp = Blueprint("users", __name__)
+
+
+@bp.route("/users")
+@admin_only
+def manage_users():
+    """Allows to check all users list, no matter the project and edit them. List is filtered by project
+    and position, sorted and split into pages by DB, see "helpers.users_table"."""
+    project = request.args.get("project", "")
+    sort = request.args.get("sort")
+    arguments = {
+        "project": project if project == "none" or project.isdigit() else "",
+        "position": request.args.get("position", ""),
+        "sort": sort if sort in USER_SORT_COLUMNS else "name",
+        "descending": request.args.get("descending", 0, type=int),
+    }
+    page = max(request.args.get("page", 1, type=int), 1)
+    users, total = users_table(page=page, **arguments)
+    positions = [position for position, in db.session.query(User.position).distinct().order_by(User.position)]
+    return render_template("users.html", users=users, page=page, pages=max(-(-total // USERS_PER_PAGE), 1),
+                           total=total, arguments=arguments, projects=choices("projects"), positions=positions)
+
+
+@bp.route("/add-user", methods=["GET", "POST"])
+@admin_only
+def add_user():
+    form = AddUser()
+    if form.validate_on_submit():
+        new_user = User()
+        new_user.name = form.name.data
+        new_user.email = form.email.data
+        new_user.password = get_password_hasher().hash(form.password.data)
+        new_user.position = form.position.data
+        db.session.add(new_user)
+        db.session.commit()
+        invalidate_choices(("users",))
+        return redirect("/")
+    return render_template("add_user.html", form=form)
+
+
+@bp.route("/edit-user/<int:user_id>", methods=["GET", "POST"])
+@login_required
+def edit_user(user_id):
+    user = User.query.get(user_id)
+    form = EditUser(
+        email=user.email,
+        position=user.position,
+    )
+    if form.validate_on_submit():
+        user.email = form.email.data
+        user.position = form.position.data
+        # avatar of user is shown on tasks
+        bump_project_versions(select(Task.project_id).join(user_task, user_task.c.task_id == Task.id)
+                              .where(user_task.c.user_id == user.id))
+        queue_event("user", user_id=user.id)
+        db.session.commit()
+        get_principal_cache().invalidate(user.id)
+        return redirect("/")
+    return render_template("edit_user.html", form=form, user=user)
+
+
+@bp.route("/delete-users", methods=["GET", "POST"])
+@admin_only
+def delete_users():
+    """Lists all users which can be deleted, no matter the project."""
+    form = DeleteList()
+    form.list.choices = choices("users")
+    if form.validate_on_submit():
+        # assignments of users are deleted by DB
+        user_ids = [int(user_id) for user_id in form.list.data]
+        bump_project_versions(select(Task.project_id).join(user_task, user_task.c.task_id == Task.id)
+                              .where(user_task.c.user_id.in_(user_ids)))
+        User.query.filter(User.id.in_(user_ids)).delete(synchronize_session=False)
+        for user_id in user_ids:
+            queue_event("user", user_id=user_id)
+        db.session.commit()
+        get_principal_cache().invalidate(*user_ids)
+        invalidate_choices(("users",))
+        return redirect("/")
+    return render_template("delete_form.html", form=form, selection_goal="user")
+
+
+@bp.route("/avatar/<avatar_hash>")
+@users_only
+def avatar(avatar_hash):
+    """Avatar of user, from disk cache. If it can't be downloaded, browser is sent to Gravatar."""
+    if not re.fullmatch("[0-9a-f]{32}", avatar_hash):
+        abort(404)
+    avatar_cache = get_avatar_cache()
+    path = avatar_cache.get(avatar_hash)
+    if path is None:
+        return redirect(avatar_cache.upstream_url(avatar_hash))
+    with open(path, "rb") as file:
+        image = file.read()
+    from avatar import image_type
+    response = Response(image, mimetype=image_type(image))
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config["AVATAR_MAX_AGE"]
+    return response